@@ -1,76 +1,214 @@
-import os
+import hmac
+import time
+from datetime import datetime
 
-import pandas as pd
 import streamlit as st
-from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente do arquivo .env
-load_dotenv()
+from notas.configuracao import obter_configuracao
+from notas.esquema import EsquemaInvalido
+from notas.metricas import metricas
 
-# Função para obter URLs (compatível com .env local e Streamlit Cloud)
-def get_url(key, default=""):
-    """
-    Obtém URL de configuração.
-    Prioriza Streamlit Secrets (produção) sobre .env (desenvolvimento).
-    """
-    # Tenta pegar do Streamlit Secrets primeiro (produção/cloud)
+# O núcleo da consulta (pandas, cache e planilhas) é importado mais abaixo,
+# depois do seletor de turmas: a página inicial aparece antes de qualquer
+# trabalho com as planilhas (ver benchmarks/partida.py)
+
+def ler_segredos():
+    """Streamlit Secrets (produção) em um dicionário; vazio sem secrets.toml (desenvolvimento)."""
     try:
-        if key in st.secrets:
-            return st.secrets[key]
-    except:
-        pass
-    # Senão, pega do .env (desenvolvimento local)
-    return os.getenv(key, default)
-
-# URLs das planilhas por turma
-# Para 4º Períodos: todos usam a mesma planilha, mas serão filtrados por turma
-URLS = {
-    "2º Período C - POO": {
-        "url": get_url("URL_2P_C_POO"),
-        "filtro_turma": None  # Não precisa filtrar
-    },
-    "4º Período A - ML": {
-        "url": get_url("URL_4P_GERAL_ML"),
-        "filtro_turma": "4P_A"  # Filtrar pela coluna TURMA
-    },
-    "4º Período B - ML": {
-        "url": get_url("URL_4P_GERAL_ML"),
-        "filtro_turma": "4P_B"  # Filtrar pela coluna TURMA
-    },
-    "4º Período C - ML": {
-        "url": get_url("URL_4P_GERAL_ML"),
-        "filtro_turma": "4P_C"  # Filtrar pela coluna TURMA
-    }
-}
+        return st.secrets.to_dict()
+    except FileNotFoundError:
+        return {}
+
+# Turmas, planilhas e códigos de acesso, resolvidos uma vez por processo
+# (Streamlit Secrets com fallback para o .env; ver notas.configuracao)
+CONFIGURACAO = obter_configuracao(ler_segredos)
+URLS = CONFIGURACAO.registro
+PLANILHAS = CONFIGURACAO.planilhas
+
+# Métricas rotuladas pelos códigos das turmas (sem expor as URLs)
+metricas.nomear_planilhas(URLS)
+
+# Métricas para o Prometheus em GET /metrics (NOTAS_METRICAS, opcional); sem a
+# porta (ocupada por outra réplica, por exemplo), a página segue sem o exportador
+if CONFIGURACAO.endereco_metricas:
+    metricas.servir(CONFIGURACAO.endereco_metricas)
 
-# Carregar os dados com cache de 5 minutos
-@st.cache_data(ttl=300)  # Cache expira em 5 minutos (300 segundos)
-def load_data(url, filtro_turma=None):
+# Código de acesso da área da coordenação (sem ele, a área não é exibida)
+TOKEN_COORDENACAO = CONFIGURACAO.obter("TOKEN_COORDENACAO")
+# Código de acesso da página de diagnóstico (?diagnostico)
+TOKEN_ADMIN = CONFIGURACAO.obter("TOKEN_ADMIN")
+
+def load_data(turma):
     """
     Carrega dados da planilha do Google Sheets.
     
     Args:
-        url: URL da planilha CSV
-        filtro_turma: Se fornecido, filtra pela coluna TURMA (ex: '4P_A', '4P_B', '4P_C')
+        turma: Turma do registro (URL da planilha e filtro da coluna TURMA)
+
+    Returns:
+        DadosTurma com as linhas da turma, ou None em caso de erro.
     """
     try:
-        data = pd.read_csv(url)
-        # Normalizar nomes das colunas
-        data.columns = data.columns.str.strip()
-        
-        # Aplicar filtro de turma se necessário
-        if filtro_turma:
-            if 'TURMA' in data.columns:
-                data = data[data['TURMA'] == filtro_turma].copy()
-            else:
-                st.error(f"❌ Coluna 'TURMA' não encontrada na planilha!")
-                return None
-        
-        return data
+        # Planilha em cache (revalidada em segundo plano quando vence), já filtrada pela turma
+        return carregar_turma(turma, PLANILHAS)
+    except ColunaTurmaAusente:
+        st.error(f"❌ Coluna 'TURMA' não encontrada na planilha!")
+        return None
+    except EsquemaInvalido as e:
+        st.error(f"❌ Erro: Colunas não encontradas!")
+        st.info(f"Colunas disponíveis: {e.disponiveis}")
+        return None
     except Exception as e:
         st.error(f"Erro ao carregar os dados: {e}")
         return None
 
+def mostrar_aluno(aluno, matricula, cartao):
+    """
+    Exibe o resultado da consulta: nome, matrícula, cartão de notas e situação.
+
+    Args:
+        aluno: Aluno encontrado (ver notas.planilha.ler_aluno)
+        matricula: Matrícula consultada
+        cartao: HTML do cartão de notas (ver notas.cartao.montar_cartao)
+    """
+    nome = aluno.nome
+    av_01_faltou = aluno.av_01_faltou
+    av_02_faltou = aluno.av_02_faltou
+    aprovado = aluno.aprovado
+    mensagem_status = ESTILOS_STATUS[aluno.status][2]
+    
+    # Mostrar informações do aluno
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.success("✅ Aluno encontrado!")
+    st.markdown(f"### 👤 {nome}")
+    st.markdown(f"**Matrícula:** {matricula}")
+    # Demais avaliações (AV 03, AF...), quando a planilha tiver
+    for rotulo, nota in aluno.outras:
+        st.markdown(f"**📝 {rotulo}:** {nota}")
+    st.markdown("---")
+
+    # Verificar se faltou alguma prova
+    if av_01_faltou and av_02_faltou:
+        st.error("⚠️ **Você não fez nenhuma das avaliações!**")
+        st.warning("📞 Procure seu professor ou coordenador do curso para verificar sua situação.")
+    elif av_01_faltou:
+        st.warning("⚠️ **Você não fez a Avaliação 01 (AV_01).**")
+        st.info("📞 Procure seu professor ou coordenador do curso.")
+        st.markdown(cartao, unsafe_allow_html=True)
+    elif av_02_faltou:
+        st.warning("⚠️ **Você não fez a Avaliação 02 (AV_02).**")
+        st.info("📞 Procure seu professor ou coordenador do curso.")
+        st.markdown(cartao, unsafe_allow_html=True)
+    else:
+        # Mostrar ambas as notas + média
+        st.markdown(cartao, unsafe_allow_html=True)
+        
+        # Mostrar mensagem de status
+        if mensagem_status:
+            if aprovado is True:
+                st.success(f"🎉 **{mensagem_status}**")
+            elif aprovado is False:
+                st.warning(f"⚠️ **{mensagem_status}**")
+                st.info("💡 **Dica:** A nota mínima para aprovação direta é 7.0. Na prova final, você precisará atingir a média necessária para aprovação.")
+
+def pagina_diagnostico():
+    """
+    Página de diagnóstico (app com ?diagnostico), restrita à administração:
+    tempo de cada etapa, acertos dos caches, estado e memória das planilhas,
+    resumo das notas de cada turma e as últimas alterações de notas.
+    """
+    st.markdown("## 🩺 Diagnóstico")
+    if not TOKEN_ADMIN:
+        st.warning("⚠️ Página de diagnóstico desabilitada. Defina TOKEN_ADMIN para usá-la.")
+        return
+    token = st.text_input("Código de acesso", type="password", key="token_admin")
+    if not token:
+        return
+    if not hmac.compare_digest(token.encode(), TOKEN_ADMIN.encode()):
+        st.error("❌ Código de acesso inválido.")
+        return
+
+    from notas.cache import cache_planilhas
+    from notas.planilha import dados_da_turma, resumir_notas
+
+    def percentual(taxa):
+        return f"{taxa:.1%}" if taxa is not None else "—"
+
+    em_cache = cache_planilhas.situacao()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Acertos no cache de planilhas", percentual(metricas.taxa_de_acerto()))
+    col2.metric("Acertos nos resultados", percentual(metricas.taxa_de_acerto("notas_resultados_total")))
+    col3.metric("Planilhas em cache", len(em_cache))
+
+    st.markdown("### ⏱️ Tempo por etapa (ms)")
+    duracoes = [
+        {
+            "etapa": serie["etapa"], "planilha": serie.get("planilha", ""), "turma": serie.get("turma", ""),
+            "medições": serie["contagem"], "média": round(serie["media_ms"], 3),
+            "p50": round(serie["p50_ms"], 3), "p95": round(serie["p95_ms"], 3), "p99": round(serie["p99_ms"], 3),
+        }
+        for serie in metricas.duracoes()
+    ]
+    if duracoes:
+        st.dataframe(duracoes, width="stretch", hide_index=True)
+    else:
+        st.info("Nenhuma medição ainda.")
+
+    st.markdown("### 📄 Planilhas")
+    agora = time.time()
+    memoria = cache_planilhas.relatorio_memoria()
+    planilhas = []
+    for url, entrada in em_cache.items():
+        nome = metricas.planilha(url)
+        particoes = entrada.planilha.particoes
+        # Memória de cada parte da planilha, em KiB (ver notas.planilha.memoria_planilha); o
+        # relatório é lido depois de em_cache e o cache não descarta planilhas
+        kib = {parte: memoria[url][parte] / 1024 for parte in ("dados", "notas", "indices", "hashes")}
+        planilhas.append({
+            "planilha": nome,
+            "buscada há (s)": round(agora - entrada.buscada_em),
+            "linhas": len(entrada.planilha.data),
+            "turmas": ", ".join(f"{turma}: {fatia.stop - fatia.start}" for turma, fatia in particoes.items()),
+            "memória (KiB)": round(sum(kib.values()), 1),
+            "dados / notas / índices (KiB)": f"{kib['dados']:.1f} / {kib['notas']:.1f} / {kib['indices']:.1f}",
+            "acertos no cache": percentual(metricas.taxa_de_acerto(planilha=nome)),
+            "circuito aberto": cache_planilhas.circuito_aberto(url),
+        })
+    if planilhas:
+        st.dataframe(planilhas, width="stretch", hide_index=True)
+    else:
+        st.info("Nenhuma planilha em cache.")
+
+    # Indicadores de cada turma, lidos das notas já calculadas (só das planilhas em cache)
+    st.markdown("### 🎓 Resumo das turmas")
+    resumos = []
+    for rotulo, turma in URLS.items():
+        entrada = em_cache.get(turma.url)
+        if entrada is None or (turma.filtro_turma and not entrada.planilha.esquema.turma):
+            continue
+        dados = dados_da_turma(entrada.planilha, turma.filtro_turma, entrada.buscada_em)
+        resumo = resumir_notas(dados.notas, dados.esquema)
+        resumos.append({
+            "turma": rotulo,
+            "alunos": resumo["alunos"],
+            "aprovados": resumo["aprovados"],
+            "prova final": resumo["prova_final"],
+            "aprovação": percentual(resumo["taxa_aprovacao"]),
+            "faltas": ", ".join(f"{avaliacao}: {faltas}" for avaliacao, faltas in resumo["faltas"].items()),
+        })
+    if resumos:
+        st.dataframe(resumos, width="stretch", hide_index=True)
+    else:
+        st.info("Nenhuma turma com planilha em cache.")
+
+    # Linhas que mudaram a cada atualização das planilhas (as 20 mais recentes)
+    st.markdown("### 🕑 Alterações recentes")
+    alteracoes = cache_planilhas.historico_alteracoes()[:20]
+    if alteracoes:
+        st.markdown("\n".join(f"- **{metricas.planilha(registro.url)}**: {registro.descrever()}" for registro in alteracoes))
+    else:
+        st.info("Nenhuma alteração de notas desde o início do processo.")
+
 # Configuração da página
 st.set_page_config(
     page_title="Sistema de Consulta de Notas", 
@@ -79,7 +217,7 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Estilo CSS customizado
+# Estilo CSS customizado (enviado uma vez por sessão; ver .streamlit/config.toml)
 st.markdown("""
     <style>
     /* Importar fonte moderna */
@@ -290,17 +428,33 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Página de diagnóstico no lugar da consulta
+if "diagnostico" in st.query_params:
+    pagina_diagnostico()
+    st.stop()
+
 # Título da aplicação
 st.markdown('<p class="main-title">📚 Sistema de Consulta de Notas</p>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Consulte suas notas de forma rápida e segura</p>', unsafe_allow_html=True)
 
-# Botão para atualizar dados
+# Botão para atualizar dados (apenas a planilha da turma selecionada)
 col1, col2, col3 = st.columns([1, 2, 1])
 with col3:
     if st.button("🔄 Atualizar Dados", help="Clique para buscar as notas mais recentes"):
-        st.cache_data.clear()
-        st.success("✅ Cache limpo! Os dados serão atualizados.")
-        st.rerun()
+        from notas.cache import cache_planilhas
+
+        config_atual = URLS.get(st.session_state.get("turma_selecionada"))
+        if config_atual and config_atual.url:
+            try:
+                _, buscou = cache_planilhas.atualizar(config_atual.url)
+                if buscou:
+                    st.success("✅ Dados atualizados!")
+                else:
+                    st.info("ℹ️ Os dados já foram atualizados há pouco. Tente novamente em instantes.")
+            except Exception as e:
+                st.error(f"Erro ao atualizar os dados: {e}")
+        else:
+            st.info("👇 Selecione uma turma para atualizar.")
 
 st.markdown("---")
 
@@ -308,32 +462,48 @@ st.markdown("---")
 st.markdown("### 🎓 Selecione sua turma:")
 turma_selecionada = st.selectbox(
     "Turma e Disciplina",
-    ["Selecione uma opção...", "2º Período C - POO", "4º Período A - ML", "4º Período B - ML", "4º Período C - ML"],
-    label_visibility="collapsed"
+    ["Selecione uma opção...", *URLS],
+    label_visibility="collapsed",
+    key="turma_selecionada"
 )
 
+# Núcleo da consulta, importado só agora que a página inicial já foi enviada
+from notas.agendador import agendador
+from notas.cache import cache_planilhas
+from notas.cartao import ESTILOS_STATUS, montar_cartao
+from notas.consulta import ColunaTurmaAusente, carregar_turma, consultar_aluno
+from notas.exportacao import XLSX_DISPONIVEL, blocos_de_notas, exportar_para_bytes, ler_matriculas
+from notas.indice_global import indice_global
+from notas.resultados import memo_resultados
+
+# Índice de matrículas de todas as turmas, para orientar quem escolheu a turma errada
+indice_global.configurar(URLS)
+
+# Carregar e manter atualizadas todas as planilhas em segundo plano (uma vez por processo)
+agendador.iniciar(PLANILHAS.values())
+
 # Verificar se uma turma foi selecionada
 if turma_selecionada != "Selecione uma opção...":
     # Carregar dados da turma selecionada
     config = URLS.get(turma_selecionada)
     
-    if config and config.get("url"):
-        url = config["url"]
-        filtro_turma = config.get("filtro_turma")
+    if config and config.url:
+        url = config.url
         
         # Carregar dados com ou sem filtro
-        data = load_data(url, filtro_turma)
+        dados = load_data(config)
         
-        if data is not None:
-            # Mostrar informação de última atualização
-            from datetime import datetime
-            hora_atual = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
+        if dados is not None:
+            # Mostrar quando a planilha foi realmente buscada no servidor
+            hora_atual = datetime.fromtimestamp(dados.buscada_em).strftime("%d/%m/%Y às %H:%M:%S")
             
             col_success, col_info = st.columns([3, 1])
             with col_success:
                 st.success(f"✅ Dados da turma **{turma_selecionada}** carregados!")
             with col_info:
                 st.info(f"🕐 {hora_atual}")
+            if cache_planilhas.circuito_aberto(url):
+                st.warning("⚠️ Não foi possível buscar a versão mais recente da planilha. Exibindo os dados do horário indicado.")
             
             st.markdown("<br>", unsafe_allow_html=True)
             
@@ -361,166 +531,32 @@ if turma_selecionada != "Selecione uma opção...":
                         # Converter matrícula para int
                         matricula_int = int(matricula)
                         
-                        # Detectar nomes de colunas automaticamente
-                        col_matricula = None
-                        col_nome = None
-                        col_av01 = None
-                        col_av02 = None
-                        col_media = None
-                        
-                        for col in data.columns:
-                            col_upper = col.upper()
-                            if 'MATRÍCULA' in col_upper or 'MATRICULA' in col_upper:
-                                col_matricula = col
-                            elif 'NOME' in col_upper or 'ALUNO' in col_upper:
-                                col_nome = col
-                            elif 'AV' in col_upper and '01' in col_upper:
-                                col_av01 = col
-                            elif 'AV' in col_upper and '02' in col_upper:
-                                col_av02 = col
-                            elif 'MÉDIA' in col_upper or 'MEDIA' in col_upper:
-                                col_media = col
-                        
-                        # Verificar se todas as colunas foram encontradas
-                        if not all([col_matricula, col_nome, col_av01, col_av02]):
-                            st.error(f"❌ Erro: Colunas não encontradas!")
-                            st.info(f"Colunas disponíveis: {list(data.columns)}")
+                        # Procurar pela matrícula no índice e ler os valores já calculados
+                        aluno = consultar_aluno(config, dados, matricula_int)
+
+                        if aluno is not None:
+                            # Cartão de notas, montado uma vez por versão da planilha, turma e matrícula
+                            with metricas.medir("cartao", planilha=metricas.planilha(url), turma=config.codigo):
+                                cartao = memo_resultados.obter(
+                                    url, dados.versao, (turma_selecionada, matricula_int, "cartao"), lambda: montar_cartao(aluno)
+                                )
+                            mostrar_aluno(aluno, matricula_int, cartao)
                         else:
-                            # Procurar pela matrícula
-                            aluno_data = data[data[col_matricula] == matricula_int]
-
-                            if not aluno_data.empty:
-                                # Extrair dados do aluno
-                                nome = aluno_data.iloc[0][col_nome]
-                                av_01 = aluno_data.iloc[0][col_av01]
-                                av_02 = aluno_data.iloc[0][col_av02]
-                                
-                                # Extrair ou calcular média
-                                if col_media and col_media in aluno_data.columns:
-                                    # Usar média da planilha
-                                    media = aluno_data.iloc[0][col_media]
-                                else:
-                                    # Calcular média (AV01 + AV02) / 2
-                                    try:
-                                        av_01_num = float(av_01) if not pd.isna(av_01) else 0
-                                        av_02_num = float(av_02) if not pd.isna(av_02) else 0
-                                        media = (av_01_num + av_02_num) / 2
-                                    except:
-                                        media = 0
-                                
-                                # Formatar notas para sempre ter 1 casa decimal
-                                def formatar_nota(nota):
-                                    try:
-                                        return f"{float(nota):.1f}"
-                                    except (ValueError, TypeError):
-                                        return nota
-                                
-                                av_01_formatada = formatar_nota(av_01)
-                                av_02_formatada = formatar_nota(av_02)
-                                media_formatada = formatar_nota(media)
-                                
-                                # Determinar status da média
-                                try:
-                                    media_num = float(media)
-                                    aprovado = media_num >= 7.0
-                                    
-                                    # Definir estilo inline direto (sem classes) - COR SÓLIDA PARA TESTE
-                                    if aprovado:
-                                        estilo_background = "background: #28a745;"  # Verde sólido
-                                        emoji_status = "🎉"
-                                        mensagem_status = "Você está APROVADO! Parabéns!"
-                                    else:
-                                        estilo_background = "background: #dc3545;"  # Vermelho sólido
-                                        emoji_status = "⚠️"
-                                        mensagem_status = "Você precisará fazer a PROVA FINAL (AF)."
-                                except Exception as e:
-                                    estilo_background = "background: rgba(255,255,255,0.15);"
-                                    emoji_status = "📊"
-                                    mensagem_status = ""
-                                    aprovado = None
-                                    emoji_status = "📊"
-                                    mensagem_status = ""
-                                    aprovado = None
-                                
-                                # Verificar se o aluno fez as provas
-                                av_01_faltou = pd.isna(av_01) or av_01 == 0 or str(av_01).strip() == '' or str(av_01).upper() == '#N/A'
-                                av_02_faltou = pd.isna(av_02) or av_02 == 0 or str(av_02).strip() == '' or str(av_02).upper() == '#N/A'
-                                
-                                # Mostrar informações do aluno
-                                st.markdown("<br>", unsafe_allow_html=True)
-                                st.success("✅ Aluno encontrado!")
-                                st.markdown(f"### 👤 {nome}")
-                                st.markdown(f"**Matrícula:** {matricula_int}")
-                                st.markdown("---")
-                                
-                                # Verificar se faltou alguma prova
-                                if av_01_faltou and av_02_faltou:
-                                    st.error("⚠️ **Você não fez nenhuma das avaliações!**")
-                                    st.warning("📞 Procure seu professor ou coordenador do curso para verificar sua situação.")
-                                elif av_01_faltou:
-                                    st.warning("⚠️ **Você não fez a Avaliação 01 (AV_01).**")
-                                    st.info("📞 Procure seu professor ou coordenador do curso.")
-                                    # Mostrar apenas AV_02
-                                    st.markdown(f"""
-                                    <div class="result-card">
-                                        <div style="text-align: center;">
-                                            <div class="nota-box" style="max-width: 300px; margin: 0 auto;">
-                                                <div class="nota-label">📝 Avaliação 02</div>
-                                                <div class="nota-valor">{av_02_formatada}</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                elif av_02_faltou:
-                                    st.warning("⚠️ **Você não fez a Avaliação 02 (AV_02).**")
-                                    st.info("📞 Procure seu professor ou coordenador do curso.")
-                                    # Mostrar apenas AV_01
-                                    st.markdown(f"""
-                                    <div class="result-card">
-                                        <div style="text-align: center;">
-                                            <div class="nota-box" style="max-width: 300px; margin: 0 auto;">
-                                                <div class="nota-label">📝 Avaliação 01</div>
-                                                <div class="nota-valor">{av_01_formatada}</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                else:
-                                    # Mostrar ambas as notas + média
-                                    st.markdown(f"""
-                                    <div class="result-card">
-                                        <h2 style="text-align: center; margin-bottom: 5px;">✅ Suas Notas</h2>
-                                        <div class="aluno-nome">{nome}</div>
-                                        <div style="display: flex; gap: 15px; margin-top: 30px; flex-wrap: wrap; justify-content: center;">
-                                            <div class="nota-box" style="flex: 1; min-width: 150px;">
-                                                <div class="nota-label">📝 Avaliação 01</div>
-                                                <div class="nota-valor">{av_01_formatada}</div>
-                                            </div>
-                                            <div class="nota-box" style="flex: 1; min-width: 150px;">
-                                                <div class="nota-label">📝 Avaliação 02</div>
-                                                <div class="nota-valor">{av_02_formatada}</div>
-                                            </div>
-                                            <div style="flex: 1; min-width: 150px; {estilo_background} backdrop-filter: blur(10px); padding: 25px; border-radius: 15px; text-align: center; margin: 10px 0; transition: all 0.3s ease; border: 3px solid rgba(255,255,255,0.3); box-shadow: 0 10px 30px rgba(0,0,0,0.3);">
-                                                <div class="nota-label">{emoji_status} MÉDIA</div>
-                                                <div class="nota-valor">{media_formatada}</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Mostrar mensagem de status
-                                    if mensagem_status:
-                                        if aprovado is True:
-                                            st.success(f"🎉 **{mensagem_status}**")
-                                        elif aprovado is False:
-                                            st.warning(f"⚠️ **{mensagem_status}**")
-                                            st.info("💡 **Dica:** A nota mínima para aprovação direta é 7.0. Na prova final, você precisará atingir a média necessária para aprovação.")
+                            # A matrícula pode estar em outra turma: as notas de lá são exibidas direto,
+                            # sem o aluno precisar trocar a turma e consultar de novo
+                            ocorrencias = indice_global.buscar(matricula_int)
+                            if ocorrencias:
+                                outras_turmas = ", ".join(ocorrencia.rotulo for ocorrencia in ocorrencias)
+                                st.warning(f"⚠️ Matrícula não encontrada em **{turma_selecionada}**, mas sim em: **{outras_turmas}**.")
+                                for ocorrencia in ocorrencias:
+                                    st.markdown(f"## 🎓 {ocorrencia.rotulo}")
+                                    mostrar_aluno(ocorrencia.aluno, matricula_int, montar_cartao(ocorrencia.aluno))
                             else:
                                 st.error("❌ Matrícula não encontrada. Verifique se digitou corretamente.")
                             
                     except ValueError:
                         st.error("❌ Por favor, digite apenas números na matrícula.")
-                        st.info(f"Colunas disponíveis: {list(data.columns)}")
+                        st.info(f"Colunas disponíveis: {list(dados.data.columns)}")
                     except Exception as e:
                         st.error(f"❌ Erro ao processar: {e}")
                 else:
@@ -529,3 +565,38 @@ if turma_selecionada != "Selecione uma opção...":
         st.warning("⚠️ Dados desta turma ainda não estão disponíveis. Por favor, selecione outra turma.")
 else:
     st.info("👆 Selecione sua turma acima para começar a consulta.")
+
+# Área da coordenação: notas de vários alunos (ou da turma inteira) em CSV/XLSX
+if TOKEN_COORDENACAO:
+    with st.sidebar:
+        st.markdown("### 🔐 Área da coordenação")
+        token = st.text_input("Código de acesso", type="password", key="token_coordenacao")
+        if token and not hmac.compare_digest(token.encode(), TOKEN_COORDENACAO.encode()):
+            st.error("❌ Código de acesso inválido.")
+        elif token:
+            turma_exportada = st.selectbox(
+                "Turma", [rotulo for rotulo, turma in URLS.items() if turma.url], key="turma_exportada"
+            )
+            origem = st.radio("Alunos", ["Todos os alunos da turma", "Lista de matrículas"], key="origem_exportacao")
+            matriculas = None
+            if origem == "Lista de matrículas":
+                coladas = st.text_area("Matrículas (uma por linha)", key="matriculas_coladas")
+                enviado = st.file_uploader("Ou envie um arquivo (CSV/TXT)", type=["csv", "txt"], key="matriculas_arquivo")
+                texto = enviado.getvalue().decode("utf-8", errors="ignore") if enviado else coladas
+                matriculas = ler_matriculas(texto)
+                st.caption(f"{len(matriculas)} matrícula(s) informada(s)")
+            formato = st.radio(
+                "Formato", ["CSV", "XLSX"] if XLSX_DISPONIVEL else ["CSV"], horizontal=True, key="formato_exportacao"
+            )
+
+            dados_exportados = load_data(URLS[turma_exportada])
+            if dados_exportados is not None and matriculas != []:
+                extensao = formato.lower()
+                # O arquivo só é gerado quando o botão é clicado, em blocos de linhas
+                st.download_button(
+                    "⬇️ Baixar notas",
+                    data=lambda: exportar_para_bytes(blocos_de_notas(dados_exportados, matriculas), extensao),
+                    file_name=f"notas_{URLS[turma_exportada].codigo}.{extensao}",
+                    mime="text/csv" if extensao == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    width="stretch",
+                )
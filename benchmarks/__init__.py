@@ -0,0 +1,18 @@
+"""
+Benchmarks e teste de carga da consulta de notas.
+
+Rodam contra planilhas sintéticas servidas localmente, sem acessar o Google
+Sheets, e gravam os resultados em JSON (benchmarks/resultados/) para comparar
+versões do código:
+
+    python -m benchmarks.micro --linhas 100 10000 500000
+    python -m benchmarks.carga --sessoes 20 --latencia 0.2
+    python -m benchmarks.comparar resultados/antes.json resultados/depois.json
+
+Módulos:
+    planilhas   Gerador de planilhas nos layouts reais (simples e consolidada)
+    servidor    Servidor HTTP local no lugar do Google Sheets, com latência
+    micro       Tempo de busca, leitura, filtro, consulta e cartão
+    carga       Sessões simultâneas do app.py pelo AppTest do Streamlit
+    comparar    Diferença entre dois resultados, apontando regressões
+"""
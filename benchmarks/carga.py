@@ -0,0 +1,134 @@
+"""
+Teste de carga do app.py com sessões simultâneas, pelo AppTest do Streamlit.
+
+    python -m benchmarks.carga --sessoes 20 --consultas 10 --linhas 50000 --latencia 0.2
+
+Cada sessão abre o app, escolhe uma turma e consulta matrículas sorteadas,
+como um aluno; o tempo de cada reexecução do script é medido do lado do
+servidor (sem navegador). As planilhas sintéticas são servidas localmente,
+com a latência informada, no lugar do Google Sheets, e os snapshots vão para
+um diretório temporário.
+
+Cada sessão roda em um processo próprio: o AppTest troca o Runtime global do
+Streamlit a cada execução e não admite sessões simultâneas em threads. Os
+processos compartilham o diretório de snapshots, como várias instâncias do
+app em produção.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.medicao import gravar_resultado, percentis
+from benchmarks.planilhas import TURMAS, gerar_planilha, matriculas_da_planilha
+from benchmarks.servidor import ServidorDePlanilhas
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+# Turmas do turmas.toml usadas no teste e a planilha de cada uma
+TURMAS_DO_TESTE = {
+    "2º Período C - POO": ("URL_2P_C_POO", "simples", None),
+    "4º Período A - ML": ("URL_4P_GERAL_ML", "consolidada", "4P_A"),
+    "4º Período B - ML": ("URL_4P_GERAL_ML", "consolidada", "4P_B"),
+}
+
+def sessao(rotulo, matriculas, consultas, semente, timeout):
+    """
+    Simula um aluno: abre o app, escolhe a turma e faz as consultas.
+
+    Returns:
+        Dicionário com o tempo de abertura, da escolha da turma e de cada
+        consulta (ms), e os erros encontrados.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    sorteio = random.Random(semente)
+    erros = []
+
+    def executar(acao):
+        inicio = time.perf_counter()
+        app = acao()
+        tempo = (time.perf_counter() - inicio) * 1000
+        if app.exception:
+            erros.append(str(app.exception[0].message))
+        return tempo
+
+    app = AppTest.from_file(str(APP), default_timeout=timeout)
+    abertura = executar(app.run)
+    escolha = executar(lambda: app.selectbox[0].select(rotulo).run())
+    tempos = []
+    if not app.text_input:
+        # Turma não carregou: as mensagens de erro da página vão para o resultado
+        erros += [elemento.value for elemento in (*app.error, *app.warning)] or ["Turma não carregada"]
+        consultas = 0
+    for _ in range(consultas):
+        app.text_input[0].input(str(sorteio.choice(matriculas)))
+        botao = next(b for b in app.button if "Consultar" in b.label)
+        tempos.append(executar(botao.click().run))
+        if not app.success:
+            erros.append("Aluno não encontrado")
+    return {"abertura_ms": abertura, "escolha_ms": escolha, "consultas_ms": tempos, "erros": erros}
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do app de notas (AppTest)")
+    parser.add_argument("--sessoes", type=int, default=10, help="Sessões simultâneas")
+    parser.add_argument("--consultas", type=int, default=10, help="Consultas por sessão")
+    parser.add_argument("--linhas", type=int, default=10_000, help="Alunos em cada planilha")
+    parser.add_argument("--latencia", type=float, default=0.1, help="Latência do servidor (segundos)")
+    parser.add_argument("--timeout", type=float, default=60, help="Tempo máximo de cada reexecução (segundos)")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    with ServidorDePlanilhas(args.latencia) as servidor, tempfile.TemporaryDirectory() as snapshots:
+        planilhas = {
+            layout: gerar_planilha(args.linhas, layout, turmas=TURMAS)
+            for layout in {layout for _, layout, _ in TURMAS_DO_TESTE.values()}
+        }
+        # Configuração resolvida em notas.configuracao.obter_configuracao (uma vez por processo)
+        # e lida pelo cache; os processos das sessões herdam o ambiente
+        os.environ["NOTAS_SNAPSHOTS"] = snapshots
+        for variavel, layout, _ in TURMAS_DO_TESTE.values():
+            os.environ[variavel] = servidor.publicar(f"{layout}.csv", planilhas[layout])
+
+        # Matrículas de cada turma, para as consultas sorteadas
+        matriculas = {
+            rotulo: matriculas_da_planilha(planilhas[layout], filtro)
+            for rotulo, (_, layout, filtro) in TURMAS_DO_TESTE.items()
+        }
+
+        inicio = time.perf_counter()
+        rotulos = [list(TURMAS_DO_TESTE)[i % len(TURMAS_DO_TESTE)] for i in range(args.sessoes)]
+        with ProcessPoolExecutor(args.sessoes) as pool:
+            futuros = [
+                pool.submit(sessao, rotulo, matriculas[rotulo], args.consultas, i, args.timeout)
+                for i, rotulo in enumerate(rotulos)
+            ]
+            sessoes = [futuro.result() for futuro in futuros]
+        duracao = time.perf_counter() - inicio
+        requisicoes = servidor.requisicoes
+
+    consultas = [tempo for s in sessoes for tempo in s["consultas_ms"]]
+    resultados = {
+        "duracao_s": duracao,
+        "consultas": len(consultas),
+        "consultas_por_s": len(consultas) / duracao,
+        "consulta": percentis(consultas),
+        "abertura": percentis([s["abertura_ms"] for s in sessoes]),
+        "escolha_turma": percentis([s["escolha_ms"] for s in sessoes]),
+        "buscas_no_servidor": requisicoes,
+        "erros": sorted({erro for s in sessoes for erro in s["erros"]}),
+    }
+    print(f"{args.sessoes} sessões, {len(consultas)} consultas em {duracao:.1f}s ({resultados['consultas_por_s']:.1f}/s)")
+    for etapa in ("abertura", "escolha_turma", "consulta"):
+        medida = resultados[etapa]
+        print(f"    {etapa:<14} p50 {medida['p50_ms']:8.1f} ms   p95 {medida['p95_ms']:8.1f} ms   p99 {medida['p99_ms']:8.1f} ms")
+    if resultados["erros"]:
+        print(f"    Erros: {resultados['erros']}")
+
+    caminho = gravar_resultado("carga", vars(args), resultados, args.saida)
+    print(f"Resultado gravado em {caminho}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compara dois resultados de benchmark (micro, carga ou partida) e aponta regressões.
+
+    python -m benchmarks.comparar resultados/micro-antes.json resultados/micro-depois.json --limite 10
+
+Sai com código 1 se alguma medida piorar mais que o limite, para uso em CI.
+"""
+import argparse
+import json
+import sys
+
+def medidas(dados):
+    """
+    Achata o resultado em {nome da medida: milissegundos}.
+
+    micro: mediana de cada etapa, por planilha ("simples/10000 leitura")
+    carga: p50 e p95 de cada etapa ("consulta p95")
+    partida: medianas do tempo até o seletor, da primeira execução e das
+        importações feitas antes do seletor (as de depois não contam: é
+        para lá que o trabalho pesado deve ir)
+    """
+    resultados = dados["resultados"]
+    if dados["tipo"] == "micro":
+        return {
+            f"{planilha} {etapa}": medida["mediana_ms"]
+            for planilha, etapas in resultados.items()
+            for etapa, medida in etapas.items()
+        }
+    if dados["tipo"] == "partida":
+        return {
+            chave.removesuffix("_ms"): resultados[chave]
+            for chave in ("seletor_ms", "primeira_execucao_ms", "importacoes_ate_seletor_ms")
+        }
+    return {
+        f"{etapa} {percentil}": resultados[etapa][f"{percentil}_ms"]
+        for etapa in ("abertura", "escolha_turma", "consulta")
+        for percentil in ("p50", "p95")
+        if resultados[etapa][f"{percentil}_ms"] is not None
+    }
+
+def comparar(antes, depois, limite):
+    """
+    Compara as medidas presentes nos dois resultados.
+
+    Returns:
+        Lista de (medida, ms antes, ms depois, razão, regrediu).
+    """
+    base, nova = medidas(antes), medidas(depois)
+    linhas = []
+    for nome in base.keys() & nova.keys():
+        razao = nova[nome] / base[nome] if base[nome] else float("inf")
+        linhas.append((nome, base[nome], nova[nome], razao, razao > 1 + limite / 100))
+    return sorted(linhas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("antes", help="JSON de referência")
+    parser.add_argument("depois", help="JSON a comparar")
+    parser.add_argument("--limite", type=float, default=10, help="Piora tolerada, em %% (padrão: 10)")
+    args = parser.parse_args()
+
+    with open(args.antes, encoding="utf-8") as arquivo:
+        antes = json.load(arquivo)
+    with open(args.depois, encoding="utf-8") as arquivo:
+        depois = json.load(arquivo)
+    if antes["tipo"] != depois["tipo"]:
+        parser.error(f"Resultados de tipos diferentes: {antes['tipo']} e {depois['tipo']}")
+
+    print(f"{antes['commit'] or '?'} -> {depois['commit'] or '?'}")
+    linhas = comparar(antes, depois, args.limite)
+    for nome, base, nova, razao, regrediu in linhas:
+        marca = "  REGRESSÃO" if regrediu else ""
+        print(f"    {nome:<36} {base:>10.3f} ms {nova:>10.3f} ms   x{razao:.2f}{marca}")
+
+    regressoes = [linha for linha in linhas if linha[-1]]
+    if regressoes:
+        print(f"{len(regressoes)} medida(s) piorou(aram) mais de {args.limite:g}%")
+        sys.exit(1)
+    print("Nenhuma regressão")
+
+if __name__ == "__main__":
+    main()
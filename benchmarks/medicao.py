@@ -0,0 +1,83 @@
+"""Cronometragem e gravação dos resultados dos benchmarks em JSON."""
+import json
+import platform
+import statistics
+import subprocess
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+# Diretório padrão dos resultados
+DIRETORIO_RESULTADOS = Path(__file__).parent / "resultados"
+
+def cronometrar(funcao, repeticoes=5):
+    """
+    Mede o tempo por chamada da função, como o timeit.
+
+    O número de chamadas por amostra é ajustado para que cada amostra dure
+    ao menos 0,2 s (uma chamada, nas operações lentas); são colhidas
+    `repeticoes` amostras.
+
+    Returns:
+        Dicionário com as chamadas por amostra e o mínimo, a mediana e o
+        máximo do tempo por chamada, em milissegundos.
+    """
+    cronometro = timeit.Timer(funcao)
+    chamadas, _ = cronometro.autorange()
+    amostras = [tempo / chamadas * 1000 for tempo in cronometro.repeat(repeticoes, chamadas)]
+    return {
+        "chamadas": chamadas,
+        "min_ms": min(amostras),
+        "mediana_ms": statistics.median(amostras),
+        "max_ms": max(amostras),
+    }
+
+def percentis(amostras_ms):
+    """p50, p95 e p99 de uma lista de tempos em milissegundos."""
+    if len(amostras_ms) < 2:
+        valor = amostras_ms[0] if amostras_ms else None
+        return {"p50_ms": valor, "p95_ms": valor, "p99_ms": valor}
+    cortes = statistics.quantiles(amostras_ms, n=100, method="inclusive")
+    return {"p50_ms": cortes[49], "p95_ms": cortes[94], "p99_ms": cortes[98]}
+
+def ambiente():
+    """Versão do código e do ambiente em que o benchmark rodou."""
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "quando": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+    }
+
+def gravar_resultado(tipo, parametros, resultados, saida=None):
+    """
+    Grava o resultado em JSON, com o ambiente em que foi medido.
+
+    Args:
+        tipo: "micro" ou "carga"
+        parametros: Argumentos usados na execução
+        resultados: Medições
+        saida: Arquivo de destino (padrão: resultados/<tipo>-<commit>-<data>.json)
+
+    Returns:
+        Path do arquivo gravado.
+    """
+    dados = {"tipo": tipo, **ambiente(), "parametros": parametros, "resultados": resultados}
+    if saida is None:
+        carimbo = dados["quando"].replace(":", "").replace("-", "")
+        saida = DIRETORIO_RESULTADOS / f"{tipo}-{dados['commit'] or 'sem-commit'}-{carimbo}.json"
+    saida = Path(saida)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(dados, ensure_ascii=False, indent=2), encoding="utf-8")
+    return saida
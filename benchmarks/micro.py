@@ -0,0 +1,99 @@
+"""
+Micro-benchmarks das etapas da consulta, por tamanho e layout de planilha.
+
+    python -m benchmarks.micro --linhas 100 10000 500000 --layout simples consolidada
+
+Etapas medidas:
+    busca              Download completo da planilha (notas.busca.baixar)
+    busca_condicional  Revalidação com ETag, respondida com 304
+    leitura            CSV -> Planilha: esquema, leitura, notas e índices
+    atualizacao        Nova versão com 1% das notas alteradas (só as linhas alteradas são recalculadas)
+    filtro             Recorte da turma (notas.planilha.dados_da_turma)
+    consulta           Matrícula no índice + leitura do aluno (buscar_aluno)
+    consulta_memo      Mesma consulta, já guardada (consultar_aluno)
+    cartao             HTML do cartão de notas (montar_cartao)
+"""
+import argparse
+import itertools
+import random
+
+from benchmarks.medicao import cronometrar, gravar_resultado
+from benchmarks.planilhas import LAYOUTS, TURMAS, alterar_notas, gerar_planilha, matriculas_da_planilha
+from benchmarks.servidor import ServidorDePlanilhas
+from notas.busca import baixar
+from notas.cache import CacheDePlanilhas
+from notas.cartao import montar_cartao
+from notas.consulta import buscar_aluno, consultar_aluno
+from notas.planilha import dados_da_turma, processar_planilha
+from notas.registro import Turma
+from notas.resultados import MemoDeResultados
+
+# Tamanhos padrão das planilhas (número de alunos)
+LINHAS_PADRAO = (100, 1_000, 10_000, 100_000, 500_000)
+# Matrículas distintas consultadas em cada medição de consulta
+MATRICULAS_CONSULTADAS = 1_000
+
+def medir_planilha(servidor, linhas, layout, repeticoes=5):
+    """
+    Mede todas as etapas para uma planilha sintética.
+
+    Returns:
+        {etapa: resultado de cronometrar}
+    """
+    conteudo = gerar_planilha(linhas, layout)
+    url = servidor.publicar(f"{layout}-{linhas}.csv", conteudo)
+    turmas = TURMAS if layout == "consolidada" else None
+    filtro = TURMAS[0] if turmas else None
+    turma = Turma("Benchmark", "BENCH", url, filtro)
+
+    etapas = {}
+    etapas["busca"] = cronometrar(lambda: baixar(url), repeticoes)
+    etag = baixar(url).etag
+    etapas["busca_condicional"] = cronometrar(lambda: baixar(url, etag=etag), repeticoes)
+
+    etapas["leitura"] = cronometrar(lambda: processar_planilha(conteudo, turmas), repeticoes)
+    planilha = processar_planilha(conteudo, turmas)
+    alterado = alterar_notas(conteudo)
+    etapas["atualizacao"] = cronometrar(lambda: processar_planilha(alterado, turmas, anterior=planilha), repeticoes)
+
+    etapas["filtro"] = cronometrar(lambda: dados_da_turma(planilha, filtro, 0.0, "v1"), repeticoes)
+    dados = dados_da_turma(planilha, filtro, 0.0, "v1")
+
+    # Matrículas da turma, em ordem aleatória e repetidas em ciclo
+    na_turma = [m for m in matriculas_da_planilha(conteudo) if m in dados.indice]
+    sorteadas = random.Random(0).sample(na_turma, min(MATRICULAS_CONSULTADAS, len(na_turma)))
+    proxima = itertools.cycle(sorteadas).__next__
+    etapas["consulta"] = cronometrar(lambda: buscar_aluno(dados, proxima()), repeticoes)
+
+    memo = MemoDeResultados(CacheDePlanilhas())
+    etapas["consulta_memo"] = cronometrar(lambda: consultar_aluno(turma, dados, proxima(), memo), repeticoes)
+
+    alunos = [buscar_aluno(dados, matricula) for matricula in sorteadas]
+    proximo_aluno = itertools.cycle(alunos).__next__
+    etapas["cartao"] = cronometrar(lambda: montar_cartao(proximo_aluno()), repeticoes)
+    return etapas
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks da consulta de notas")
+    parser.add_argument("--linhas", type=int, nargs="+", default=LINHAS_PADRAO, help="Tamanhos das planilhas")
+    parser.add_argument("--layout", nargs="+", choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência do servidor (segundos)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Amostras por etapa")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    resultados = {}
+    with ServidorDePlanilhas(args.latencia) as servidor:
+        for layout in args.layout:
+            for linhas in args.linhas:
+                etapas = medir_planilha(servidor, linhas, layout, args.repeticoes)
+                resultados[f"{layout}/{linhas}"] = etapas
+                print(f"{layout:>11} {linhas:>7} linhas")
+                for etapa, medida in etapas.items():
+                    print(f"    {etapa:<18} {medida['mediana_ms']:>10.3f} ms")
+
+    caminho = gravar_resultado("micro", vars(args), resultados, args.saida)
+    print(f"Resultado gravado em {caminho}")
+
+if __name__ == "__main__":
+    main()
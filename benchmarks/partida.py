@@ -0,0 +1,173 @@
+"""
+Partida a frio do app.py: tempo até o seletor de turmas e importações.
+
+    python -m benchmarks.partida --repeticoes 5 --orcamento 300
+
+Cada repetição é um processo Python novo, rodando com `python -X importtime`,
+que executa o app uma vez pelo AppTest, como a primeira visita depois que o
+app dorme no Streamlit Cloud. São medidos, a partir do início do script:
+
+    seletor            Tempo até o seletor de turmas ser desenhado
+    primeira_execucao  Tempo da primeira execução completa do script
+    importacoes_*      Tempo de importação dos módulos, antes e depois do
+                       seletor (saída do -X importtime)
+
+O próprio Streamlit já está importado quando o script começa (no servidor,
+ele é importado antes da primeira visita) e não entra na conta. Sai com
+código 1 se o seletor passar do orçamento ou se algum módulo pesado
+(MODULOS_PESADOS) for importado antes dele.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+# Módulos que não podem ser importados antes de o seletor aparecer
+MODULOS_PESADOS = ("pandas", "numpy", "pyarrow", "openpyxl")
+# Tempo máximo até o seletor de turmas (ms), medido a partir do início do script
+ORCAMENTO_SELETOR_MS = 300
+# Marcas na saída de erro do processo filho, separando as importações por fase
+MARCA_INICIO = "partida: inicio do script"
+MARCA_SELETOR = "partida: seletor de turmas"
+# Linha do -X importtime: "import time:  self [us] | cumulative | nome" (o recuo indica o aninhamento)
+LINHA_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def _processo_filho():
+    """Roda o app uma vez (processo iniciado por medir_partida) e imprime as medidas em JSON."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    marcos = {}
+    selectbox = st.selectbox
+
+    def seletor(*args, **kwargs):
+        # Primeiro selectbox do script: o seletor de turmas
+        if "seletor_ms" not in marcos:
+            marcos["seletor_ms"] = (time.perf_counter() - inicio) * 1000
+            marcos["pesados_antes_do_seletor"] = [modulo for modulo in MODULOS_PESADOS if modulo in sys.modules]
+            print(MARCA_SELETOR, file=sys.stderr, flush=True)
+        return selectbox(*args, **kwargs)
+
+    st.selectbox = seletor
+    app = AppTest.from_file(str(APP), default_timeout=120)
+    print(MARCA_INICIO, file=sys.stderr, flush=True)
+    inicio = time.perf_counter()
+    app.run()
+    marcos["primeira_execucao_ms"] = (time.perf_counter() - inicio) * 1000
+    marcos["erros"] = [str(excecao.message) for excecao in app.exception]
+    print(json.dumps(marcos))
+
+def importacoes(saida_importtime):
+    """
+    Separa as importações do -X importtime pelas marcas do processo filho.
+
+    Returns:
+        {"ate_seletor": [(módulo, µs)], "depois": [(módulo, µs)]}, só com as
+        importações feitas direto pelo script (tempo acumulado, que inclui
+        as dependências), das mais lentas para as mais rápidas.
+    """
+    fases = {"ate_seletor": [], "depois": []}
+    fase = None
+    for linha in saida_importtime.splitlines():
+        if MARCA_INICIO in linha:
+            fase = "ate_seletor"
+        elif MARCA_SELETOR in linha:
+            fase = "depois"
+        elif fase and (encontrada := LINHA_IMPORTTIME.match(linha)):
+            _, acumulado, recuo, modulo = encontrada.groups()
+            if not recuo:
+                fases[fase].append((modulo, int(acumulado)))
+    return {fase: sorted(lista, key=lambda item: -item[1]) for fase, lista in fases.items()}
+
+def medir_partida(timeout=180):
+    """
+    Mede uma partida a frio em um processo novo (com o ambiente atual).
+
+    Returns:
+        Medidas do processo filho, com o tempo de importação de cada fase
+        (ms) e os módulos mais lentos de cada uma.
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "benchmarks.partida", "--processo-filho"],
+        capture_output=True, text=True, timeout=timeout, cwd=APP.parent,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(f"Processo de partida falhou:\n{processo.stderr[-2000:]}")
+    medidas = json.loads(processo.stdout.strip().splitlines()[-1])
+    for fase, lista in importacoes(processo.stderr).items():
+        medidas[f"importacoes_{fase}_ms"] = sum(us for _, us in lista) / 1000
+        medidas[f"mais_lentas_{fase}"] = [(modulo, us / 1000) for modulo, us in lista[:5]]
+    return medidas
+
+def main():
+    parser = argparse.ArgumentParser(description="Partida a frio do app de notas")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Processos medidos")
+    parser.add_argument("--linhas", type=int, default=10_000, help="Alunos em cada planilha")
+    parser.add_argument("--latencia", type=float, default=0.1, help="Latência do servidor (segundos)")
+    parser.add_argument("--orcamento", type=float, default=ORCAMENTO_SELETOR_MS, help="Tempo máximo até o seletor (ms)")
+    parser.add_argument("--saida", help="Arquivo JSON de resultado")
+    parser.add_argument("--processo-filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.processo_filho:
+        _processo_filho()
+        return
+
+    import tempfile
+
+    from benchmarks.carga import TURMAS_DO_TESTE
+    from benchmarks.medicao import gravar_resultado
+    from benchmarks.planilhas import TURMAS, gerar_planilha
+    from benchmarks.servidor import ServidorDePlanilhas
+
+    with ServidorDePlanilhas(args.latencia) as servidor:
+        for variavel, layout, _ in TURMAS_DO_TESTE.values():
+            os.environ[variavel] = servidor.publicar(f"{layout}.csv", gerar_planilha(args.linhas, layout, turmas=TURMAS))
+        partidas = []
+        for _ in range(args.repeticoes):
+            # Sem snapshots em disco, como um processo recém-criado
+            with tempfile.TemporaryDirectory() as snapshots:
+                os.environ["NOTAS_SNAPSHOTS"] = snapshots
+                partidas.append(medir_partida())
+
+    def mediana(chave):
+        return statistics.median(partida[chave] for partida in partidas)
+
+    resultados = {
+        chave: mediana(chave)
+        for chave in ("seletor_ms", "primeira_execucao_ms", "importacoes_ate_seletor_ms", "importacoes_depois_ms")
+    }
+    resultados["pesados_antes_do_seletor"] = sorted({m for p in partidas for m in p["pesados_antes_do_seletor"]})
+    resultados["mais_lentas_ate_seletor"] = partidas[-1]["mais_lentas_ate_seletor"]
+    resultados["mais_lentas_depois"] = partidas[-1]["mais_lentas_depois"]
+    resultados["erros"] = sorted({erro for p in partidas for erro in p["erros"]})
+
+    print(f"Partida a frio ({args.repeticoes} processos, mediana)")
+    print(f"    seletor de turmas   {resultados['seletor_ms']:8.1f} ms   (orçamento {args.orcamento:g} ms)")
+    print(f"    primeira execução   {resultados['primeira_execucao_ms']:8.1f} ms")
+    for fase, nome in (("ate_seletor", "até o seletor"), ("depois", "depois do seletor")):
+        print(f"    importações {nome:<18} {resultados[f'importacoes_{fase}_ms']:8.1f} ms")
+        for modulo, ms in resultados[f"mais_lentas_{fase}"]:
+            print(f"        {modulo:<28} {ms:8.1f} ms")
+    if resultados["erros"]:
+        print(f"    Erros: {resultados['erros']}")
+
+    caminho = gravar_resultado("partida", vars(args), resultados, args.saida)
+    print(f"Resultado gravado em {caminho}")
+
+    falhas = []
+    if resultados["seletor_ms"] > args.orcamento:
+        falhas.append(f"seletor em {resultados['seletor_ms']:.1f} ms, acima do orçamento de {args.orcamento:g} ms")
+    if resultados["pesados_antes_do_seletor"]:
+        falhas.append(f"módulos pesados importados antes do seletor: {resultados['pesados_antes_do_seletor']}")
+    if falhas:
+        print("Orçamento de partida estourado: " + "; ".join(falhas))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
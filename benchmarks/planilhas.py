@@ -0,0 +1,89 @@
+"""
+Planilhas de notas sintéticas, nos layouts usados pelas turmas.
+
+    simples:      Aluno | MATRÍCULA | AV. 01 | AV. 02 | MÉDIA
+    consolidada:  TURMA | NOME | MATRÍCULA | AV 01 | AV 02 | MÉDIA | OBS
+
+As notas seguem a planilha real: uma casa decimal, alunos que faltaram com
+#N/A ou célula vazia, e a MÉDIA calculada pela própria planilha. A mesma
+semente gera sempre o mesmo CSV.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+LAYOUTS = ("simples", "consolidada")
+# Turmas da planilha consolidada (valores da coluna TURMA)
+TURMAS = ("4P_A", "4P_B", "4P_C")
+# Primeira matrícula gerada
+MATRICULA_INICIAL = 1_800_000
+# Fração das avaliações em falta
+FRACAO_FALTAS = 0.05
+
+NOMES = ("Ana", "Bruno", "Carla", "Davi", "Eva", "Fábio", "Gil", "Helena", "Iris", "João", "Lara", "Mateus")
+SOBRENOMES = ("Souza", "Lima", "Dias", "Rocha", "Alves", "Reis", "Nunes", "Paz", "Melo", "Costa", "Araújo")
+
+def gerar_planilha(linhas, layout="simples", semente=0, turmas=TURMAS):
+    """
+    Gera o CSV de uma planilha de notas.
+
+    Args:
+        linhas: Número de alunos
+        layout: "simples" ou "consolidada" (ver LAYOUTS)
+        semente: Semente do gerador aleatório
+        turmas: Valores de TURMA distribuídos entre os alunos (layout consolidada)
+
+    Returns:
+        Bytes do CSV, como exportado pelo Google Sheets.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout desconhecido: {layout}")
+    rng = np.random.default_rng(semente)
+
+    matriculas = MATRICULA_INICIAL + rng.permutation(linhas)
+    nomes = (
+        pd.Series(np.array(NOMES, dtype=object)[rng.integers(len(NOMES), size=linhas)])
+        + " "
+        + pd.Series(np.array(SOBRENOMES, dtype=object)[rng.integers(len(SOBRENOMES), size=linhas)])
+    )
+    notas = np.round(rng.uniform(0, 10, size=(linhas, 2)), 1)
+    faltas = rng.random((linhas, 2)) < FRACAO_FALTAS
+    media = np.round(np.where(faltas, 0, notas).sum(axis=1) / 2, 2)
+
+    def coluna(i):
+        # Faltas aparecem ora como #N/A, ora como célula vazia
+        texto = pd.Series(notas[:, i]).map("{:g}".format)
+        vazias = rng.random(linhas) < 0.5
+        return texto.where(~faltas[:, i], np.where(vazias, "", "#N/A"))
+
+    if layout == "simples":
+        tabela = pd.DataFrame({
+            "Aluno": nomes, "MATRÍCULA": matriculas, "AV. 01": coluna(0), "AV. 02": coluna(1), "MÉDIA": media,
+        })
+    else:
+        tabela = pd.DataFrame({
+            "TURMA": np.array(turmas, dtype=object)[rng.integers(len(turmas), size=linhas)],
+            "NOME": nomes, "MATRÍCULA": matriculas, "AV 01": coluna(0), "AV 02": coluna(1), "MÉDIA": media,
+            "OBS": "",
+        })
+    return tabela.to_csv(index=False).encode()
+
+def alterar_notas(conteudo, fracao=0.01, semente=1):
+    """
+    Retorna o CSV com a AV 02 de uma fração dos alunos alterada, como em uma
+    correção de notas entre duas versões da planilha.
+    """
+    tabela = pd.read_csv(io.BytesIO(conteudo), dtype=str, keep_default_na=False)
+    rng = np.random.default_rng(semente)
+    coluna = [col for col in tabela.columns if "02" in col][0]
+    alteradas = rng.random(len(tabela)) < fracao
+    tabela.loc[alteradas, coluna] = np.round(rng.uniform(0, 10, size=int(alteradas.sum())), 1).astype(str)
+    return tabela.to_csv(index=False).encode()
+
+def matriculas_da_planilha(conteudo, turma=None):
+    """Matrículas do CSV gerado (só as da TURMA informada, se houver), na ordem das linhas."""
+    tabela = pd.read_csv(io.BytesIO(conteudo), usecols=lambda col: col in ("TURMA", "MATRÍCULA"))
+    if turma:
+        tabela = tabela[tabela["TURMA"] == turma]
+    return tabela["MATRÍCULA"].tolist()
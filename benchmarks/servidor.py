@@ -0,0 +1,161 @@
+"""
+Servidor HTTP local que faz o papel do Google Sheets nos benchmarks.
+
+Serve os CSVs publicados com ETag (como o Google Sheets), Last-Modified,
+ambos ou nenhum validador, respondendo 304 às requisições condicionais, e espera `latencia` segundos antes de
+cada resposta, para simular a rede. Falhas podem ser injetadas por caminho
+(ver falhar): respostas de erro, corpos truncados e atrasos, para exercitar
+as retentativas, os timeouts e o disjuntor de notas.busca.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, deque
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class ServidorDePlanilhas:
+    """
+    Servidor de planilhas em uma thread, para uso com `with`.
+
+    Args:
+        latencia: Segundos de espera antes de cada resposta
+        endereco: Par (host, porta); porta 0 escolhe uma livre
+    """
+
+    def __init__(self, latencia=0.0, endereco=("127.0.0.1", 0)):
+        self.latencia = latencia
+        self.requisicoes = 0
+        self.respostas = Counter()  # Status HTTP -> respostas enviadas
+        self._planilhas = {}  # Caminho -> (conteúdo, ETag, Last-Modified); validadores ausentes são None
+        self._modificada_em = 0  # Segundos do último Last-Modified, que só cresce
+        self._falhas = {}  # Caminho -> deque de (status, truncar, atraso) das próximas requisições
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.requisicoes += 1
+                    planilha = servidor._planilhas.get(self.path)
+                    falhas = servidor._falhas.get(self.path)
+                    status, truncar, atraso = falhas.popleft() if falhas else (None, False, 0.0)
+                if servidor.latencia or atraso:
+                    time.sleep(servidor.latencia + atraso)
+                if planilha is None:
+                    self.send_error(HTTPStatus.NOT_FOUND)
+                    return
+                if status is not None:
+                    self.send_error(status)
+                    return
+                conteudo, etag, last_modified = planilha
+                if self._nao_modificada(etag, last_modified):
+                    self.send_response(HTTPStatus.NOT_MODIFIED)
+                    self._validadores(etag, last_modified)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "text/csv; charset=utf-8")
+                self.send_header("Content-Length", str(len(conteudo)))
+                self._validadores(etag, last_modified)
+                self.end_headers()
+                if truncar:
+                    # Metade do corpo anunciado e a conexão fechada, como uma queda no meio do download
+                    self.wfile.write(conteudo[:len(conteudo) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(conteudo)
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    # O cliente desistiu antes da resposta (timeout): não é erro do servidor
+                    pass
+
+            def _nao_modificada(self, etag, last_modified):
+                # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110)
+                if etag and "If-None-Match" in self.headers:
+                    return self.headers["If-None-Match"] == etag
+                if last_modified and "If-Modified-Since" in self.headers:
+                    try:
+                        desde = parsedate_to_datetime(self.headers["If-Modified-Since"])
+                    except (TypeError, ValueError):
+                        return False
+                    return parsedate_to_datetime(last_modified) <= desde
+                return False
+
+            def _validadores(self, etag, last_modified):
+                if etag:
+                    self.send_header("ETag", etag)
+                if last_modified:
+                    self.send_header("Last-Modified", last_modified)
+
+            def send_response(self, codigo, mensagem=None):
+                with servidor._lock:
+                    servidor.respostas[int(codigo)] += 1
+                super().send_response(codigo, mensagem)
+
+            def log_message(self, formato, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(endereco, Handler)
+        self._http.daemon_threads = True
+        self._thread = None
+
+    def publicar(self, caminho, conteudo, etag=True, last_modified=False):
+        """
+        Publica (ou substitui) o CSV no caminho informado.
+
+        Args:
+            caminho: Caminho da planilha no servidor
+            conteudo: Bytes do CSV
+            etag: Enviar ETag (hash do conteúdo)
+            last_modified: Enviar Last-Modified; cada publicação avança pelo
+                menos um segundo, para a nova versão nunca parecer igual à anterior
+
+        Returns:
+            URL da planilha no servidor.
+        """
+        caminho = "/" + caminho.lstrip("/")
+        valor_etag = '"' + hashlib.sha256(conteudo).hexdigest()[:16] + '"' if etag else None
+        with self._lock:
+            valor_data = None
+            if last_modified:
+                self._modificada_em = max(int(time.time()), self._modificada_em + 1)
+                valor_data = formatdate(self._modificada_em, usegmt=True)
+            self._planilhas[caminho] = (conteudo, valor_etag, valor_data)
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}{caminho}"
+
+    def falhar(self, caminho, vezes=1, status=HTTPStatus.SERVICE_UNAVAILABLE, truncar=False, atraso=0.0):
+        """
+        Faz as próximas `vezes` requisições do caminho falharem.
+
+        Substitui as falhas ainda pendentes do caminho (vezes=0 só as
+        remove); depois delas, o caminho volta a ser servido normalmente.
+
+        Args:
+            caminho: Caminho da planilha, como em publicar
+            vezes: Número de requisições afetadas
+            status: Status de erro das respostas (None: responder normalmente)
+            truncar: Enviar só metade do corpo, com o Content-Length inteiro,
+                e fechar a conexão (só com status=None)
+            atraso: Segundos de espera adicionais antes de responder
+        """
+        caminho = "/" + caminho.lstrip("/")
+        with self._lock:
+            self._falhas[caminho] = deque([(status, truncar, atraso)] * vezes)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._http.serve_forever, name="servidor-planilhas", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *excecao):
+        self._http.shutdown()
+        self._http.server_close()
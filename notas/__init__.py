@@ -0,0 +1 @@
+"""Núcleo do Sistema de Consulta de Notas: carga, cache e consulta das planilhas."""
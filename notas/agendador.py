@@ -0,0 +1,138 @@
+"""
+Aquecimento e atualização das planilhas em segundo plano.
+
+O agendador é iniciado pelo app.py, mas roda uma única vez por processo: as
+reexecuções do script a cada interação só encontram o agendador já em
+andamento. Ao iniciar, todas as planilhas do registro são carregadas em
+paralelo; depois, cada uma é revalidada no seu próprio intervalo, com uma
+variação aleatória para que as buscas não coincidam.
+
+As novas versões são publicadas pelo cache (notas.cache) trocando a Entrada
+inteira de uma vez, então quem lê nunca vê uma planilha pela metade. Com o
+agendador ativo, a consulta dos alunos só lê a memória.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from notas.cache import BUSCAS_PARALELAS, ESPERA_APOS_FALHA, cache_planilhas
+
+logger = logging.getLogger(__name__)
+
+# Variação aleatória dos intervalos (fração subtraída, para renovar antes de vencer)
+VARIACAO_INTERVALO = 0.1
+
+class Agendador:
+    """
+    Mantém as planilhas de um cache carregadas e atualizadas.
+
+    Args:
+        cache: CacheDePlanilhas a manter aquecido
+        variacao: Fração máxima subtraída, ao acaso, de cada intervalo
+        buscas_paralelas: Número máximo de buscas simultâneas
+    """
+
+    def __init__(self, cache, variacao=VARIACAO_INTERVALO, buscas_paralelas=BUSCAS_PARALELAS):
+        self._cache = cache
+        self.variacao = variacao
+        self.buscas_paralelas = buscas_paralelas
+        self._fontes = {}  # URL -> FontePlanilha
+        self._proximas = {}  # URL -> time.monotonic() da próxima revalidação
+        self._thread = None
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def iniciar(self, fontes):
+        """
+        Inicia o agendador, se ainda não estiver rodando.
+
+        Pode ser chamado a cada execução do app: as chamadas seguintes só
+        incluem planilhas que ainda não estavam sendo mantidas.
+
+        Args:
+            fontes: FontePlanilha de cada planilha (ver notas.registro)
+        """
+        with self._lock:
+            novas = {fonte.url: fonte for fonte in fontes if fonte.url not in self._fontes}
+            self._fontes.update(novas)
+            for url in novas:
+                self._proximas[url] = 0.0  # Aquecer já
+            if self.ativo:
+                if novas:
+                    self._acordar.set()
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="agendador-planilhas", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        """Encerra o agendador e aguarda a thread terminar."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _intervalo(self, fonte):
+        intervalo = min(fonte.intervalo or self._cache.ttl, self._cache.intervalo_revalidacao)
+        return intervalo * random.uniform(1 - self.variacao, 1)
+
+    def _executar(self):
+        with self._lock:
+            fontes = list(self._fontes.values())
+            self._proximas.update(dict.fromkeys(self._fontes, float("inf")))
+        self._aquecer(fontes)
+
+        with ThreadPoolExecutor(self.buscas_paralelas, thread_name_prefix="atualizar-planilha") as pool:
+            while not self._parar.is_set():
+                with self._lock:
+                    agora = time.monotonic()
+                    for url, quando in self._proximas.items():
+                        if quando <= agora:
+                            self._proximas[url] = float("inf")  # Em andamento
+                            pool.submit(self._atualizar, self._fontes[url])
+                    espera = min(self._proximas.values(), default=float("inf")) - agora
+                self._acordar.wait(min(espera, self._cache.ttl))
+                self._acordar.clear()
+
+    def _aquecer(self, fontes):
+        """Carrega todas as planilhas em paralelo e agenda a primeira revalidação de cada uma."""
+        inicio = time.monotonic()
+        resultados = self._cache.carregar(fontes, self.buscas_paralelas)
+        falhas = [url for url, resultado in resultados.items() if isinstance(resultado, Exception)]
+        logger.info(
+            "Agendador: %d planilha(s) carregada(s) em %.1fs, %d falha(s)",
+            len(resultados), time.monotonic() - inicio, len(falhas),
+        )
+        for fonte in fontes:
+            self._agendar(fonte, fonte.url in falhas)
+
+    def _atualizar(self, fonte):
+        try:
+            if fonte.url in self._cache.situacao():
+                self._cache.revalidar(fonte.url)
+            else:
+                # Ainda não carregada: passa pelo snapshot, turmas e colunas
+                self._cache.obter_entrada(fonte.url, fonte.turmas, fonte.colunas)
+        except Exception:
+            self._agendar(fonte, falhou=True)  # O cache já registrou a falha
+        else:
+            self._agendar(fonte)
+
+    def _agendar(self, fonte, falhou=False):
+        if falhou:
+            proxima = ESPERA_APOS_FALHA * random.uniform(1, 1 + self.variacao)
+        else:
+            proxima = self._intervalo(fonte)
+        with self._lock:
+            self._proximas[fonte.url] = time.monotonic() + proxima
+        self._acordar.set()
+
+# Agendador único do processo, mantendo o cache compartilhado aquecido
+agendador = Agendador(cache_planilhas)
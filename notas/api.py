@@ -0,0 +1,289 @@
+"""
+API HTTP de consulta de notas, para o app móvel e o portal do curso.
+
+Roda em um processo separado do Streamlit, com a mesma carga, cache e
+cálculo de notas (notas.consulta), e responde direto dos índices em memória:
+
+    python -m notas.api --porta 8600
+
+Rotas:
+    GET /turmas                        Turmas disponíveis (código e rótulo)
+    GET /notas/{codigo}/{matricula}    Notas do aluno na turma
+    GET /notas/{matricula}             Notas do aluno em todas as turmas em que aparece
+    GET /exportacao[/{codigo}]         Notas de todos os alunos (da turma ou do curso), em CSV/XLSX
+    POST /exportacao/{codigo}          Notas das matrículas enviadas no corpo (uma por linha, até 1 MiB)
+    GET /metrics                       Métricas do processo, no formato do Prometheus
+
+As rotas de exportação são da coordenação: exigem o cabeçalho
+"Authorization: Bearer <TOKEN_COORDENACAO>" e ficam desabilitadas sem o token.
+O CSV é enviado em blocos (Transfer-Encoding: chunked) à medida que é gerado.
+
+Com NOTAS_COMPARTILHADO=1 e o mesmo diretório de snapshots do app, a API
+lê as planilhas buscadas pelo processo líder, sem buscá-las de novo.
+"""
+import argparse
+import hmac
+import json
+import logging
+import os
+import shutil
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from notas.cache import cache_planilhas
+from notas.consulta import carregar_turma, consultar_aluno, descrever_aluno
+from notas.esquema import EsquemaInvalido
+from notas.exportacao import XLSX_DISPONIVEL, blocos_de_notas, blocos_de_varias_turmas, exportar_csv, exportar_para_arquivo, ler_matriculas
+from notas.indice_global import IndiceGlobal, indice_global
+from notas.metricas import TIPO_PROMETHEUS, metricas
+from notas.registro import planilhas_do_registro, turma_por_codigo
+
+logger = logging.getLogger(__name__)
+
+# Endereço padrão da API
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8600
+
+# Tamanho máximo do corpo de um POST de exportação (lista de matrículas)
+TAMANHO_MAXIMO_ENVIO = 1024 * 1024
+# Tipo de conteúdo de cada formato de exportação
+TIPOS_EXPORTACAO = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+class ErroDaConsulta(Exception):
+    """Erro a ser respondido ao cliente com o status HTTP informado."""
+
+    def __init__(self, status, mensagem):
+        self.status = status
+        super().__init__(mensagem)
+
+class ConsultaHandler(BaseHTTPRequestHandler):
+    """Atende as rotas da API; registro e cache vêm do servidor (ver criar_servidor)."""
+
+    protocol_version = "HTTP/1.1"  # Conexões reaproveitadas entre requisições
+    disable_nagle_algorithm = True  # Cabeçalho e corpo saem sem esperar o ACK do cliente
+
+    def do_GET(self):
+        self._atender()
+
+    def do_POST(self):
+        self._atender(post=True)
+
+    def _atender(self, post=False):
+        """Encaminha a requisição; o corpo de um POST só é lido pela rota que o aceita."""
+        try:
+            endereco = urlsplit(self.path)
+            partes = [unquote(parte) for parte in endereco.path.strip("/").split("/")]
+            if partes[0] == "exportacao" and len(partes) <= 2:
+                self._exportar(partes[1:], parse_qs(endereco.query), post)
+                return
+            if post:
+                raise ErroDaConsulta(HTTPStatus.METHOD_NOT_ALLOWED, "Método não permitido")
+            if partes == ["metrics"]:
+                self._enviar(HTTPStatus.OK, TIPO_PROMETHEUS, metricas.texto_prometheus().encode())
+                return
+            if partes == ["turmas"]:
+                corpo = self._turmas()
+            elif len(partes) == 3 and partes[0] == "notas":
+                corpo = self._notas(*partes[1:])
+            elif len(partes) == 2 and partes[0] == "notas":
+                corpo = self._notas_em_todas(partes[1])
+            else:
+                raise ErroDaConsulta(HTTPStatus.NOT_FOUND, "Rota não encontrada")
+            self._responder(HTTPStatus.OK, corpo)
+        except ErroDaConsulta as e:
+            if post:
+                # O corpo pode não ter sido lido: não reaproveitar a conexão
+                self.close_connection = True
+            self._responder(e.status, {"erro": str(e)})
+
+    def _turmas(self):
+        return [
+            {"codigo": turma.codigo, "rotulo": turma.rotulo}
+            for turma in self.server.registro.values() if turma.url
+        ]
+
+    def _notas(self, codigo, matricula):
+        turma = self._turma(codigo)
+        matricula = self._matricula(matricula)
+        dados = self._carregar(turma)
+        aluno = consultar_aluno(turma, dados, matricula)
+        if aluno is None:
+            raise ErroDaConsulta(HTTPStatus.NOT_FOUND, "Matrícula não encontrada")
+        return descrever_aluno(aluno, matricula, turma, dados.buscada_em)
+
+    def _notas_em_todas(self, matricula):
+        """Notas do aluno em todas as turmas do registro (ver notas.indice_global)."""
+        matricula = self._matricula(matricula)
+        # Só as planilhas ainda fora do cache são carregadas (e indexadas) antes da
+        # busca; as que falharem ficam de fora. As em cache são renovadas pelo agendador
+        em_cache = self.server.cache.situacao()
+        carregadas = self.server.cache.carregar(
+            fonte for url, fonte in self.server.planilhas.items() if url not in em_cache
+        )
+        ocorrencias = self.server.indice.buscar(matricula)
+        if not ocorrencias:
+            if any(isinstance(resultado, Exception) for resultado in carregadas.values()):
+                raise ErroDaConsulta(HTTPStatus.SERVICE_UNAVAILABLE, "Planilhas de algumas turmas indisponíveis")
+            raise ErroDaConsulta(HTTPStatus.NOT_FOUND, "Matrícula não encontrada")
+        return [
+            descrever_aluno(ocorrencia.aluno, matricula, self.server.registro[ocorrencia.rotulo], ocorrencia.buscada_em)
+            for ocorrencia in ocorrencias
+        ]
+
+    def _exportar(self, codigo, consulta, post):
+        """
+        Exporta as notas da turma (ou de todas as turmas, sem código).
+
+        Em um POST, as matrículas do corpo só são lidas depois de conferidos o
+        token, o formato e a turma.
+        """
+        token = self.server.token
+        if not token:
+            raise ErroDaConsulta(HTTPStatus.NOT_FOUND, "Exportação desabilitada")
+        recebido = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(recebido.encode(), token.encode()):
+            raise ErroDaConsulta(HTTPStatus.UNAUTHORIZED, "Token de acesso inválido")
+
+        formato = consulta.get("formato", ["csv"])[0]
+        if formato not in TIPOS_EXPORTACAO:
+            raise ErroDaConsulta(HTTPStatus.BAD_REQUEST, f"Formato desconhecido: {formato}")
+        if formato == "xlsx" and not XLSX_DISPONIVEL:
+            raise ErroDaConsulta(HTTPStatus.BAD_REQUEST, "Exportação em XLSX indisponível no servidor")
+        if post and not codigo:
+            raise ErroDaConsulta(HTTPStatus.BAD_REQUEST, "Informe a turma das matrículas enviadas")
+
+        if codigo:
+            turmas = [self._turma(codigo[0])]
+        else:
+            turmas = [turma for turma in self.server.registro.values() if turma.url]
+        matriculas = ler_matriculas(self._ler_envio()) if post else None
+        # Turmas carregadas e matrículas resolvidas antes de responder, para que os erros ainda tenham status
+        carregadas = [(turma, self._carregar(turma)) for turma in turmas]
+        if codigo:
+            blocos = blocos_de_notas(carregadas[0][1], matriculas)
+        else:
+            # Turmas com avaliações diferentes: todas as linhas com as colunas de todas
+            blocos = blocos_de_varias_turmas([(turma.rotulo, dados) for turma, dados in carregadas])
+        nome = f"notas_{codigo[0] if codigo else 'curso'}.{formato}"
+
+        if formato == "xlsx":
+            with exportar_para_arquivo(blocos, formato) as arquivo:
+                tamanho = arquivo.seek(0, os.SEEK_END)
+                arquivo.seek(0)
+                self._iniciar_arquivo(nome, formato, {"Content-Length": str(tamanho)})
+                shutil.copyfileobj(arquivo, self.wfile)
+            return
+
+        self._iniciar_arquivo(nome, formato, {"Transfer-Encoding": "chunked"})
+        try:
+            for pedaco in exportar_csv(blocos):
+                conteudo = pedaco.encode()
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(conteudo), conteudo))
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception:
+            # O status já foi enviado: encerra a conexão para o cliente perceber a falha
+            logger.exception("Exportação interrompida: %s", nome)
+            self.close_connection = True
+
+    def _ler_envio(self):
+        """Corpo do POST, recusado sem Content-Length válido ou acima de TAMANHO_MAXIMO_ENVIO."""
+        tamanho = self.headers.get("Content-Length", "")
+        if not (tamanho.isascii() and tamanho.isdigit()):
+            raise ErroDaConsulta(HTTPStatus.BAD_REQUEST, "Content-Length ausente ou inválido")
+        if int(tamanho) > TAMANHO_MAXIMO_ENVIO:
+            raise ErroDaConsulta(
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Envie no máximo {TAMANHO_MAXIMO_ENVIO // 1024} KiB de matrículas"
+            )
+        return self.rfile.read(int(tamanho)).decode("utf-8", errors="ignore")
+
+    def _matricula(self, texto):
+        try:
+            return int(texto)
+        except ValueError:
+            raise ErroDaConsulta(HTTPStatus.BAD_REQUEST, "A matrícula deve conter apenas números")
+
+    def _turma(self, codigo):
+        turma = turma_por_codigo(self.server.registro, codigo)
+        if turma is None or not turma.url:
+            raise ErroDaConsulta(HTTPStatus.NOT_FOUND, f"Turma não encontrada: {codigo}")
+        return turma
+
+    def _carregar(self, turma):
+        try:
+            return carregar_turma(turma, self.server.planilhas, self.server.cache)
+        except EsquemaInvalido as e:
+            raise ErroDaConsulta(HTTPStatus.BAD_GATEWAY, str(e))
+        except Exception as e:
+            logger.warning("Planilha da turma %s indisponível: %s", turma.codigo, e)
+            raise ErroDaConsulta(HTTPStatus.SERVICE_UNAVAILABLE, "Planilha da turma indisponível")
+
+    def _iniciar_arquivo(self, nome, formato, cabecalhos):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", TIPOS_EXPORTACAO[formato])
+        self.send_header("Content-Disposition", f'attachment; filename="{nome}"')
+        self.send_header("Cache-Control", "no-store")
+        for chave, valor in cabecalhos.items():
+            self.send_header(chave, valor)
+        self.end_headers()
+
+    def _responder(self, status, corpo):
+        self._enviar(status, "application/json; charset=utf-8", json.dumps(corpo, ensure_ascii=False).encode())
+
+    def _enviar(self, status, tipo, conteudo):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(conteudo)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+def criar_servidor(registro, endereco=(HOST_PADRAO, PORTA_PADRAO), cache=cache_planilhas, token=None, indice=None):
+    """
+    Cria o servidor da API (ainda sem atender; ver serve_forever).
+
+    Args:
+        registro: {rótulo: Turma} (ver notas.registro.carregar_registro)
+        endereco: Par (host, porta)
+        cache: CacheDePlanilhas de onde as turmas são lidas
+        token: Token da coordenação para as rotas de exportação (None as desabilita)
+        indice: IndiceGlobal das matrículas (padrão: o do processo, ou um
+            novo sobre o cache informado)
+    """
+    servidor = ThreadingHTTPServer(endereco, ConsultaHandler)
+    servidor.daemon_threads = True
+    servidor.registro = registro
+    servidor.planilhas = planilhas_do_registro(registro)
+    servidor.cache = cache
+    servidor.token = token
+    servidor.indice = indice or (indice_global if cache is cache_planilhas else IndiceGlobal(cache))
+    servidor.indice.configurar(registro)
+    metricas.nomear_planilhas(registro)
+    return servidor
+
+def main():
+    from notas.agendador import agendador
+    from notas.configuracao import obter_configuracao
+
+    parser = argparse.ArgumentParser(description="API de consulta de notas")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    configuracao = obter_configuracao()
+    servidor = criar_servidor(
+        configuracao.registro, (args.host, args.porta), token=configuracao.obter("TOKEN_COORDENACAO") or None
+    )
+    agendador.iniciar(servidor.planilhas.values())
+    logger.info("API de notas em http://%s:%d", args.host, args.porta)
+    servidor.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Download das planilhas com requisições HTTP condicionais."""
+import http.client
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Limite para conectar e para cada espera por dados do servidor (segundos)
+TIMEOUT_CONEXAO = 10
+# Limite total para receber o corpo da planilha (segundos)
+TIMEOUT_LEITURA = 30
+# Tentativas por download, com espera aleatória crescente entre elas
+TENTATIVAS = 3
+ESPERA_BASE = 0.5
+# Tamanho dos blocos lidos do servidor
+TAMANHO_BLOCO = 64 * 1024
+
+class CircuitoAberto(Exception):
+    """O servidor da planilha falhou seguidamente e as buscas estão suspensas."""
+
+class Resposta(NamedTuple):
+    """Resultado de um download de planilha."""
+    conteudo: bytes | None  # None quando o servidor respondeu 304
+    etag: str | None
+    last_modified: str | None
+
+    @property
+    def nao_modificada(self):
+        return self.conteudo is None
+
+class Disjuntor:
+    """
+    Circuit breaker de uma URL.
+
+    Depois de falhas_para_abrir buscas seguidas com erro, o circuito abre e
+    as buscas falham na hora (CircuitoAberto), sem ir à rede, por
+    tempo_aberto segundos. Passado esse tempo, uma única busca de teste é
+    liberada: se der certo o circuito fecha, se falhar abre de novo.
+    """
+
+    def __init__(self, falhas_para_abrir=3, tempo_aberto=60):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._testando = False
+        self._lock = threading.Lock()
+
+    @property
+    def aberto(self):
+        with self._lock:
+            return self._falhas >= self.falhas_para_abrir
+
+    def permitir(self):
+        """
+        Libera uma busca ou levanta CircuitoAberto.
+
+        Raises:
+            CircuitoAberto: se o circuito está aberto ou já há uma busca de teste.
+        """
+        with self._lock:
+            if self._falhas < self.falhas_para_abrir:
+                return
+            if time.monotonic() < self._aberto_ate or self._testando:
+                raise CircuitoAberto(
+                    f"Planilha indisponível após {self._falhas} falhas seguidas"
+                )
+            self._testando = True
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._testando = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._testando = False
+            if self._falhas >= self.falhas_para_abrir:
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+
+def erro_transitorio(erro):
+    """Indica se vale a pena tentar o download de novo depois do erro."""
+    if isinstance(erro, urllib.error.HTTPError):
+        return erro.code >= 500 or erro.code == 429
+    return isinstance(erro, (urllib.error.URLError, http.client.HTTPException, OSError))
+
+def baixar(url, etag=None, last_modified=None, timeout_conexao=TIMEOUT_CONEXAO,
+           timeout_leitura=TIMEOUT_LEITURA, tentativas=TENTATIVAS, espera_base=ESPERA_BASE):
+    """
+    Baixa a planilha, enviando os validadores da versão anterior.
+
+    Com ETag/Last-Modified, o servidor pode responder 304 (Not Modified) e
+    a planilha não precisa ser baixada nem processada de novo. Caminhos
+    locais (sem http/https) são lidos direto do disco, sem validadores.
+
+    Erros transitórios (rede, timeout, 5xx, corpo truncado) são repetidos
+    até `tentativas` vezes, com espera aleatória entre 0 e
+    espera_base * 2^n segundos antes da tentativa n + 1.
+
+    Args:
+        url: URL da planilha CSV (ou caminho de um arquivo local)
+        etag: ETag da versão em cache, se houver
+        last_modified: Last-Modified da versão em cache, se houver
+        timeout_conexao: Limite para conectar e para cada espera por dados, em segundos
+        timeout_leitura: Limite total para receber o corpo, em segundos
+        tentativas: Número máximo de tentativas
+        espera_base: Base da espera entre tentativas, em segundos
+
+    Returns:
+        Resposta; conteudo é None se a versão em cache continua válida.
+    """
+    if urlparse(url).scheme not in ('http', 'https'):
+        return Resposta(Path(url).read_bytes(), None, None)
+
+    for tentativa in range(tentativas):
+        try:
+            return _baixar_uma_vez(url, etag, last_modified, timeout_conexao, timeout_leitura)
+        except Exception as e:
+            if tentativa == tentativas - 1 or not erro_transitorio(e):
+                raise
+            logger.info("Tentativa %d de baixar a planilha falhou: %s", tentativa + 1, e)
+            time.sleep(random.uniform(0, espera_base * 2 ** tentativa))
+
+def _baixar_uma_vez(url, etag, last_modified, timeout_conexao, timeout_leitura):
+    cabecalhos = {}
+    if etag:
+        cabecalhos['If-None-Match'] = etag
+    if last_modified:
+        cabecalhos['If-Modified-Since'] = last_modified
+
+    requisicao = urllib.request.Request(url, headers=cabecalhos)
+    try:
+        with urllib.request.urlopen(requisicao, timeout=timeout_conexao) as resposta:
+            conteudo = _ler_corpo(resposta, timeout_leitura)
+            return Resposta(
+                conteudo,
+                resposta.headers.get('ETag'),
+                resposta.headers.get('Last-Modified'),
+            )
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return Resposta(
+                None,
+                e.headers.get('ETag') or etag,
+                e.headers.get('Last-Modified') or last_modified,
+            )
+        raise
+
+def _ler_corpo(resposta, timeout_leitura):
+    """Lê o corpo inteiro dentro do prazo, rejeitando respostas truncadas."""
+    prazo = time.monotonic() + timeout_leitura
+    partes = []
+    while parte := resposta.read1(TAMANHO_BLOCO):
+        partes.append(parte)
+        if time.monotonic() > prazo:
+            raise TimeoutError(f"Planilha não recebida em {timeout_leitura}s")
+
+    conteudo = b''.join(partes)
+    esperado = resposta.headers.get('Content-Length')
+    if esperado is not None and len(conteudo) < int(esperado):
+        raise http.client.IncompleteRead(conteudo, int(esperado) - len(conteudo))
+    return conteudo
@@ -0,0 +1,489 @@
+"""
+Cache em memória das planilhas, compartilhado por todas as sessões do processo.
+
+Diferente do st.cache_data, a planilha vencida não é descartada: ela continua
+sendo servida enquanto uma única revalidação em segundo plano pergunta ao
+servidor se houve mudança (stale-while-revalidate). Só a primeira carga de
+cada URL bloqueia a requisição do usuário.
+
+Cada URL tem seu próprio circuit breaker (notas.busca.Disjuntor): enquanto o
+servidor estiver falhando, as revalidações falham na hora e a última versão
+boa continua sendo servida, sem que nenhuma sessão fique presa esperando a
+rede.
+
+Com um diretório de snapshots (notas.snapshots), a primeira carga de cada URL
+parte da última versão gravada em disco e a busca no servidor acontece em
+segundo plano. Se o diretório for compartilhado entre processos, só o líder
+busca no servidor e grava os snapshots; os demais revalidam relendo os
+snapshots gravados por ele.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+from notas.busca import Disjuntor, baixar
+from notas.esquema import resolver_esquema
+from notas.metricas import metricas
+from notas.planilha import memoria_planilha, montar_planilha, processar_planilha
+from notas.snapshots import Snapshots
+
+logger = logging.getLogger(__name__)
+
+# Tempo até a planilha em cache ser revalidada (5 minutos)
+TTL_PADRAO = 300
+# Espera antes de tentar revalidar de novo quando a busca falha
+ESPERA_APOS_FALHA = 30
+# Intervalo mínimo entre buscas forçadas (botão "Atualizar Dados") da mesma planilha
+INTERVALO_MINIMO_ATUALIZACAO = 60
+# Planilhas distintas buscadas ao mesmo tempo por carregar()
+BUSCAS_PARALELAS = 8
+# Intervalo de releitura dos snapshots nos processos que não buscam no servidor
+INTERVALO_LEITURA_COMPARTILHADA = 30
+# Alterações de planilha guardadas no histórico (ver historico_alteracoes)
+TAMANHO_HISTORICO = 200
+
+@dataclass(frozen=True)
+class Entrada:
+    """Versão de uma planilha em cache e os dados para revalidá-la."""
+    planilha: object
+    etag: str | None
+    last_modified: str | None
+    hash_conteudo: str
+    buscada_em: float  # time.time() da última busca bem-sucedida no servidor
+    valida_ate: float  # time.monotonic() a partir do qual a entrada é revalidada
+    turmas: frozenset | None = None  # Turmas mantidas ao processar (None: todas)
+    colunas: tuple = ()  # Pares (papel, coluna) forçados ao processar
+
+@dataclass(frozen=True)
+class RegistroDeAlteracao:
+    """Linhas de uma turma que mudaram em uma atualização da planilha."""
+    url: str
+    turma: str | None  # None em planilhas sem a coluna TURMA
+    alteracao: object  # notas.planilha.Alteracao
+    quando: float  # time.time() da busca que trouxe a mudança
+
+    def descrever(self):
+        """Ex: '3 notas alteradas em 4P_B às 14:02'."""
+        def contar(n, singular, plural):
+            return f"{n} {singular if n == 1 else plural}" if n else None
+
+        partes = filter(None, [
+            contar(self.alteracao.alteradas, "nota alterada", "notas alteradas"),
+            contar(self.alteracao.inseridas, "aluno incluído", "alunos incluídos"),
+            contar(self.alteracao.removidas, "aluno removido", "alunos removidos"),
+        ])
+        local = f"em {self.turma}" if self.turma is not None else "na planilha"
+        return f"{', '.join(partes)} {local} às {datetime.fromtimestamp(self.quando):%H:%M}"
+
+class CacheDePlanilhas:
+    """
+    Cache de planilhas por URL com revalidação condicional.
+
+    Args:
+        ttl: Segundos até uma planilha ser revalidada
+        baixar: Função de download (ver notas.busca.baixar)
+        processar: Função que transforma o CSV baixado (com turmas, colunas e a
+            planilha anterior) em Planilha
+        intervalo_minimo: Segundos mínimos entre buscas forçadas da mesma URL
+        snapshots: Snapshots em disco usados na primeira carga (None desativa)
+    """
+
+    def __init__(self, ttl=TTL_PADRAO, baixar=baixar, processar=processar_planilha,
+                 intervalo_minimo=INTERVALO_MINIMO_ATUALIZACAO, snapshots=None):
+        self.ttl = ttl
+        self.intervalo_minimo = intervalo_minimo
+        self._baixar = baixar
+        self._processar = processar
+        self._snapshots = snapshots
+        self._entradas = {}
+        self._em_andamento = {}  # URL -> Future da busca em curso
+        self._disjuntores = {}  # URL -> Disjuntor
+        self._leituras = {}  # URL -> (turmas, colunas) usadas ao processar a planilha
+        self._assinantes = []  # Funções chamadas a cada nova versão de planilha
+        self._historico = deque(maxlen=TAMANHO_HISTORICO)  # RegistroDeAlteracao, do mais antigo ao mais novo
+        self._lock = threading.Lock()
+
+    def obter(self, url, turmas=None, colunas=()):
+        """Retorna a planilha da URL (ver obter_entrada)."""
+        return self.obter_entrada(url, turmas, colunas).planilha
+
+    def obter_entrada(self, url, turmas=None, colunas=()):
+        """
+        Retorna a Entrada em cache da planilha da URL.
+
+        Se a versão em cache venceu, ela é retornada mesmo assim e uma
+        revalidação é disparada em segundo plano. Sem versão em cache, usa o
+        snapshot em disco (revalidando em segundo plano) ou, na falta dele,
+        busca na hora; a carga é compartilhada com quem pedir a mesma URL ao
+        mesmo tempo.
+
+        Args:
+            url: URL da planilha
+            turmas: Valores de TURMA usados dessa planilha; as linhas das
+                demais turmas são descartadas já na leitura (None: todas)
+            colunas: Pares (papel, coluna) que dispensam a detecção automática
+        """
+        with self._lock:
+            self._leituras[url] = (frozenset(turmas) if turmas is not None else None, tuple(colunas))
+            entrada = self._entradas.get(url)
+            if entrada is not None:
+                vencida = time.monotonic() >= entrada.valida_ate
+                if vencida:
+                    self._revalidar_em_segundo_plano(url)
+            else:
+                futuro, responsavel = self._reservar(url)
+
+        resultado = "ausente" if entrada is None else "vencida" if vencida else "acerto"
+        metricas.contar("notas_cache_consultas_total", planilha=metricas.planilha(url), resultado=resultado)
+        if entrada is not None:
+            return entrada
+
+        if responsavel:
+            self._buscar(url, futuro, do_snapshot=True)
+        return futuro.result()
+
+    def carregar(self, fontes, buscas_paralelas=BUSCAS_PARALELAS, forcar=False):
+        """
+        Carrega várias planilhas ao mesmo tempo (ver obter_entrada).
+
+        Cada URL é buscada uma única vez, em um pool limitado de threads, de
+        modo que o tempo total fica próximo ao da planilha mais lenta. A
+        falha de uma planilha não impede as demais.
+
+        Args:
+            fontes: FontePlanilha de cada planilha (ver notas.registro)
+            buscas_paralelas: Número máximo de buscas simultâneas
+            forcar: Revalidar no servidor mesmo as planilhas em cache (ver revalidar)
+
+        Returns:
+            Dicionário {url: Entrada}, ou a exceção no lugar da Entrada se a
+            carga falhou.
+        """
+        fontes = {fonte.url: fonte for fonte in fontes}
+        if not fontes:
+            return {}
+
+        with ThreadPoolExecutor(min(buscas_paralelas, len(fontes)), thread_name_prefix="carregar-planilha") as pool:
+            futuros = {
+                url: pool.submit(self.revalidar, url) if forcar
+                else pool.submit(self.obter_entrada, url, fonte.turmas, fonte.colunas)
+                for url, fonte in fontes.items()
+            }
+
+        resultados = {}
+        for url, futuro in futuros.items():
+            try:
+                resultados[url] = futuro.result()
+            except Exception as e:
+                resultados[url] = e
+        return resultados
+
+    def revalidar(self, url):
+        """
+        Busca a planilha da URL no servidor agora e aguarda o resultado.
+
+        Igual a atualizar, mas sem o intervalo mínimo; usado pelo agendador
+        (notas.agendador) para renovar as planilhas antes de vencerem.
+
+        Returns:
+            Entrada nova (ou a mesma, renovada, se a planilha não mudou).
+        """
+        with self._lock:
+            futuro, responsavel = self._reservar(url)
+
+        if responsavel:
+            self._buscar(url, futuro)
+        return futuro.result()
+
+    def atualizar(self, url):
+        """
+        Força a busca da planilha da URL no servidor, sem afetar as demais.
+
+        Pedidos simultâneos para a mesma URL compartilham uma única busca e
+        todos recebem o mesmo resultado. Se a planilha foi buscada há menos
+        de intervalo_minimo segundos, a versão em cache é mantida.
+
+        Returns:
+            Tupla (entrada, buscou); buscou é False quando o pedido foi
+            recusado pelo intervalo mínimo.
+        """
+        with self._lock:
+            entrada = self._entradas.get(url)
+            recente = entrada is not None and time.time() - entrada.buscada_em < self.intervalo_minimo
+            if recente and url not in self._em_andamento:
+                return entrada, False
+            futuro, responsavel = self._reservar(url)
+
+        if responsavel:
+            self._buscar(url, futuro)
+        return futuro.result(), True
+
+    def assinar(self, assinante):
+        """
+        Registra uma função chamada com (url, entrada) a cada nova versão de planilha.
+
+        A função roda na thread que buscou a planilha, depois de a versão ser
+        publicada; revalidações sem mudança (304 ou mesmo conteúdo) não
+        notificam.
+        """
+        self._assinantes.append(assinante)
+
+    def situacao(self):
+        """Retorna {url: Entrada} com todas as planilhas em cache no momento."""
+        with self._lock:
+            return dict(self._entradas)
+
+    def historico_alteracoes(self):
+        """Retorna as últimas alterações das planilhas (RegistroDeAlteracao), da mais recente à mais antiga."""
+        with self._lock:
+            return list(reversed(self._historico))
+
+    def medidas(self):
+        """
+        Idade, linhas e estado de cada planilha em cache, lidos na hora da
+        exportação das métricas (ver Metricas.adicionar_coletor).
+        """
+        agora = time.time()
+        for url, entrada in self.situacao().items():
+            rotulos = {"planilha": metricas.planilha(url)}
+            yield (
+                "notas_planilha_idade_segundos", "Segundos desde a última busca da planilha no servidor",
+                rotulos, agora - entrada.buscada_em,
+            )
+            yield "notas_planilha_linhas", "Linhas da planilha em cache", rotulos, len(entrada.planilha.data)
+            for turma, fatia in entrada.planilha.particoes.items():
+                yield (
+                    "notas_turma_linhas", "Linhas de cada TURMA da planilha",
+                    {**rotulos, "turma": turma}, fatia.stop - fatia.start,
+                )
+            yield (
+                "notas_circuito_aberto", "1 enquanto as buscas da planilha estão suspensas por falhas",
+                rotulos, int(self.circuito_aberto(url)),
+            )
+
+    def relatorio_memoria(self):
+        """Retorna {url: memoria_planilha(...)} de cada planilha em cache."""
+        return {url: memoria_planilha(entrada.planilha) for url, entrada in self.situacao().items()}
+
+    @property
+    def intervalo_revalidacao(self):
+        """
+        Segundos entre revalidações de cada planilha.
+
+        Processos que não lideram o diretório compartilhado só releem o
+        snapshot em disco, então revalidam com mais frequência.
+        """
+        if self._snapshots is not None and not self._snapshots.liderar():
+            return min(self.ttl, INTERVALO_LEITURA_COMPARTILHADA)
+        return self.ttl
+
+    def circuito_aberto(self, url):
+        """Indica se as buscas da URL estão suspensas por falhas seguidas."""
+        return self._disjuntor(url).aberto
+
+    def _disjuntor(self, url):
+        with self._lock:
+            return self._disjuntores.setdefault(url, Disjuntor())
+
+    def _reservar(self, url):
+        """Retorna (futuro, responsavel) da busca da URL; chamar com o lock."""
+        futuro = self._em_andamento.get(url)
+        if futuro is not None:
+            return futuro, False
+        futuro = self._em_andamento[url] = Future()
+        return futuro, True
+
+    def _revalidar_em_segundo_plano(self, url):
+        futuro, responsavel = self._reservar(url)
+        if responsavel:
+            threading.Thread(
+                target=self._buscar, args=(url, futuro), name="revalidar-planilha", daemon=True
+            ).start()
+
+    def _buscar(self, url, futuro, do_snapshot=False):
+        with self._lock:
+            anterior = self._entradas.get(url)
+
+        try:
+            # As etapas medidas dentro da busca (notas.planilha) saem com o nome da planilha
+            with metricas.rotulos(planilha=metricas.planilha(url)):
+                entrada = None
+                if do_snapshot and anterior is None:
+                    entrada = self._entrada_do_snapshot(url)
+                if entrada is None:
+                    entrada, do_snapshot = self._nova_entrada(url, anterior), False
+        except Exception as e:
+            logger.warning("Falha ao buscar a planilha: %s", e)
+            with self._lock:
+                del self._em_andamento[url]
+                if anterior is not None and self._entradas.get(url) is anterior:
+                    # Continua servindo a versão anterior e tenta de novo mais tarde
+                    self._entradas[url] = replace(
+                        anterior, valida_ate=time.monotonic() + ESPERA_APOS_FALHA
+                    )
+            futuro.set_exception(e)
+            return
+
+        with self._lock:
+            self._entradas[url] = entrada
+        if anterior is None or entrada.planilha is not anterior.planilha:
+            # Ainda reservada: as notificações da mesma URL não se sobrepõem
+            self._notificar(url, entrada)
+        with self._lock:
+            del self._em_andamento[url]
+            if do_snapshot:
+                self._revalidar_em_segundo_plano(url)
+        futuro.set_result(entrada)
+
+    def _notificar(self, url, entrada):
+        for assinante in list(self._assinantes):
+            try:
+                assinante(url, entrada)
+            except Exception:
+                logger.exception("Falha ao notificar nova versão da planilha")
+
+    def _entrada_do_snapshot(self, url, anterior=None, valida_ate=0.0):
+        """
+        Monta a Entrada a partir do snapshot em disco, se houver um gravado
+        com as mesmas turmas e colunas.
+
+        Com a versão anterior, só os metadados são lidos quando o conteúdo
+        não mudou, e as linhas iguais reaproveitam as notas já calculadas.
+        """
+        if self._snapshots is None:
+            return None
+        try:
+            turmas, colunas = self._leituras.get(url, (None, ()))
+
+            def mesma_leitura(metadados):
+                gravadas = metadados['turmas']
+                return (
+                    (frozenset(gravadas) if gravadas is not None else None) == turmas
+                    and tuple(map(tuple, metadados.get('colunas', ()))) == colunas
+                )
+
+            metadados = self._snapshots.metadados(url)
+            if metadados is None or not mesma_leitura(metadados):
+                return None
+            if anterior is not None and metadados['hash_conteudo'] == anterior.hash_conteudo:
+                return replace(anterior, buscada_em=metadados['buscada_em'], valida_ate=valida_ate)
+
+            with metricas.medir("snapshot"):
+                data, metadados = self._snapshots.carregar(url)
+            if not mesma_leitura(metadados):
+                return None  # Regravado com outras turmas ou colunas nesse meio tempo
+            del metadados['turmas'], metadados['colunas']
+            with metricas.medir("calculo"):
+                planilha = montar_planilha(
+                    data, resolver_esquema(data.columns, colunas), anterior.planilha if anterior else None
+                )
+            return Entrada(
+                planilha=planilha,
+                valida_ate=valida_ate,
+                turmas=turmas,
+                colunas=colunas,
+                **metadados,
+            )
+        except Exception as e:
+            logger.warning("Snapshot da planilha ignorado: %s", e)
+            return None
+
+    def _salvar_snapshot(self, url, entrada):
+        # Só o líder grava no diretório; o processo que buscou no servidor por
+        # ainda não haver snapshot do líder fica com a versão só em memória
+        if self._snapshots is None or not self._snapshots.liderar():
+            return
+        try:
+            self._snapshots.salvar(
+                url,
+                entrada.planilha.data,
+                etag=entrada.etag,
+                last_modified=entrada.last_modified,
+                hash_conteudo=entrada.hash_conteudo,
+                buscada_em=entrada.buscada_em,
+                turmas=sorted(entrada.turmas) if entrada.turmas is not None else None,
+                colunas=entrada.colunas,
+            )
+        except Exception as e:
+            logger.warning("Falha ao gravar o snapshot da planilha: %s", e)
+
+    def _nova_entrada(self, url, anterior):
+        if self._snapshots is not None and not self._snapshots.liderar():
+            # Outro processo busca no servidor: usar a versão que ele gravou
+            entrada = self._entrada_do_snapshot(url, anterior, time.monotonic() + self.intervalo_revalidacao)
+            if entrada is not None:
+                if anterior is None or entrada.planilha is not anterior.planilha:
+                    self._registrar_alteracoes(url, entrada)
+                return entrada
+            # Sem snapshot do líder (ainda): buscar no servidor mesmo assim
+
+        disjuntor = self._disjuntor(url)
+        disjuntor.permitir()
+        try:
+            with metricas.medir("busca"):
+                resposta = self._baixar(
+                    url,
+                    etag=anterior.etag if anterior else None,
+                    last_modified=anterior.last_modified if anterior else None,
+                )
+        except Exception:
+            disjuntor.registrar_falha()
+            metricas.contar("notas_buscas_total", resultado="falha")
+            raise
+        disjuntor.registrar_sucesso()
+
+        validade = {
+            'etag': resposta.etag,
+            'last_modified': resposta.last_modified,
+            'buscada_em': time.time(),
+            'valida_ate': time.monotonic() + self.ttl,
+        }
+
+        # Validadores só são enviados quando existe versão anterior
+        if resposta.nao_modificada:
+            metricas.contar("notas_buscas_total", resultado="nao_modificada")
+            return replace(anterior, **validade)
+
+        # Sem validadores no servidor, o hash evita reprocessar o mesmo conteúdo
+        hash_conteudo = hashlib.sha256(resposta.conteudo).hexdigest()
+        if anterior is not None and hash_conteudo == anterior.hash_conteudo:
+            metricas.contar("notas_buscas_total", resultado="mesmo_conteudo")
+            return replace(anterior, **validade)
+        metricas.contar("notas_buscas_total", resultado="nova_versao")
+
+        turmas, colunas = self._leituras.get(url, (None, ()))
+        # As linhas que não mudaram reaproveitam as notas calculadas na versão anterior
+        entrada = Entrada(
+            planilha=self._processar(resposta.conteudo, turmas, colunas, anterior.planilha if anterior else None),
+            hash_conteudo=hash_conteudo,
+            turmas=turmas,
+            colunas=colunas,
+            **validade,
+        )
+        memoria = memoria_planilha(entrada.planilha)
+        logger.info(
+            "Planilha processada: %d linhas, %.1f KiB em memória",
+            memoria["linhas"], (memoria["dados"] + memoria["notas"] + memoria["indices"] + memoria["hashes"]) / 1024,
+        )
+        self._registrar_alteracoes(url, entrada)
+        self._salvar_snapshot(url, entrada)
+        return entrada
+
+    def _registrar_alteracoes(self, url, entrada):
+        registros = [
+            RegistroDeAlteracao(url, turma, alteracao, entrada.buscada_em)
+            for turma, alteracao in (entrada.planilha.alteracoes or {}).items()
+        ]
+        for registro in registros:
+            logger.info("Planilha atualizada: %s", registro.descrever())
+        with self._lock:
+            self._historico.extend(registros)
+
+# Cache único do processo: o app.py é reexecutado a cada interação, este módulo não
+cache_planilhas = CacheDePlanilhas(snapshots=Snapshots())
+metricas.adicionar_coletor(cache_planilhas.medidas)
@@ -0,0 +1,61 @@
+"""
+Cartão de notas exibido ao aluno (HTML), sem depender do Streamlit.
+
+Usado pelo app.py, que guarda o cartão montado por versão da planilha (ver
+notas.resultados), e pelos benchmarks (benchmarks/micro.py).
+"""
+from notas.consulta import MENSAGENS_STATUS
+from notas.planilha import STATUS_APROVADO, STATUS_INDEFINIDO, STATUS_PROVA_FINAL
+
+# Estilo da caixa da MÉDIA e mensagem para cada status
+ESTILOS_STATUS = {
+    STATUS_APROVADO: ("background: #28a745;", "🎉", MENSAGENS_STATUS[STATUS_APROVADO]),  # Verde sólido
+    STATUS_PROVA_FINAL: ("background: #dc3545;", "⚠️", MENSAGENS_STATUS[STATUS_PROVA_FINAL]),  # Vermelho sólido
+    STATUS_INDEFINIDO: ("background: rgba(255,255,255,0.15);", "📊", ""),
+}
+
+def montar_cartao(aluno):
+    """
+    Monta o HTML do cartão com as notas do aluno.
+
+    Com uma das avaliações em falta, o cartão mostra só a outra, sem a MÉDIA.
+
+    Returns:
+        HTML do cartão, ou None se o aluno faltou às duas avaliações.
+    """
+    if aluno.av_01_faltou and aluno.av_02_faltou:
+        return None
+    if aluno.av_01_faltou or aluno.av_02_faltou:
+        # Mostrar apenas a avaliação feita
+        numero, nota = ("02", aluno.av_02) if aluno.av_01_faltou else ("01", aluno.av_01)
+        return f"""
+        <div class="result-card">
+            <div style="text-align: center;">
+                <div class="nota-box" style="max-width: 300px; margin: 0 auto;">
+                    <div class="nota-label">📝 Avaliação {numero}</div>
+                    <div class="nota-valor">{nota}</div>
+                </div>
+            </div>
+        </div>
+        """
+    estilo_background, emoji_status, _ = ESTILOS_STATUS[aluno.status]
+    return f"""
+    <div class="result-card">
+        <h2 style="text-align: center; margin-bottom: 5px;">✅ Suas Notas</h2>
+        <div class="aluno-nome">{aluno.nome}</div>
+        <div style="display: flex; gap: 15px; margin-top: 30px; flex-wrap: wrap; justify-content: center;">
+            <div class="nota-box" style="flex: 1; min-width: 150px;">
+                <div class="nota-label">📝 Avaliação 01</div>
+                <div class="nota-valor">{aluno.av_01}</div>
+            </div>
+            <div class="nota-box" style="flex: 1; min-width: 150px;">
+                <div class="nota-label">📝 Avaliação 02</div>
+                <div class="nota-valor">{aluno.av_02}</div>
+            </div>
+            <div style="flex: 1; min-width: 150px; {estilo_background} backdrop-filter: blur(10px); padding: 25px; border-radius: 15px; text-align: center; margin: 10px 0; transition: all 0.3s ease; border: 3px solid rgba(255,255,255,0.3); box-shadow: 0 10px 30px rgba(0,0,0,0.3);">
+                <div class="nota-label">{emoji_status} MÉDIA</div>
+                <div class="nota-valor">{aluno.media}</div>
+            </div>
+        </div>
+    </div>
+    """
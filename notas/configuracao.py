@@ -0,0 +1,101 @@
+"""
+Configuração do processo: turmas, planilhas e demais valores do .env/Secrets.
+
+O app lê cada valor do Streamlit Secrets (produção), com fallback para as
+variáveis de ambiente e o arquivo .env (desenvolvimento). A leitura dos
+Secrets, do .env e do turmas.toml é feita uma única vez, na primeira
+chamada de obter_configuracao; as reexecuções do app reaproveitam o
+resultado. Mudanças nesses arquivos valem a partir do próximo início do
+processo.
+
+Este módulo não depende do pandas nem do cache: o app resolve a
+configuração e desenha a página inicial antes de carregar qualquer planilha.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+from notas.registro import carregar_registro, planilhas_do_registro
+
+logger = logging.getLogger(__name__)
+
+# Host das métricas quando NOTAS_METRICAS traz só a porta
+HOST_METRICAS_PADRAO = "127.0.0.1"
+
+@dataclass(frozen=True)
+class Configuracao:
+    """Valores resolvidos na partida do processo."""
+    segredos: dict  # Streamlit Secrets ({} fora do Streamlit ou sem secrets.toml)
+    registro: dict  # {rótulo: Turma} (ver notas.registro.carregar_registro)
+    planilhas: dict  # {url: FontePlanilha} (ver notas.registro.planilhas_do_registro)
+    endereco_metricas: tuple | None = None  # (host, porta) de NOTAS_METRICAS (ver ler_endereco)
+
+    def obter(self, chave, padrao=""):
+        """Valor da chave nos Secrets; senão, na variável de ambiente (ou no .env)."""
+        return _resolver(self.segredos, chave, padrao)
+
+_configuracao = None
+_lock = threading.Lock()
+
+def _resolver(segredos, chave, padrao=""):
+    if chave in segredos:
+        return segredos[chave]
+    return os.getenv(chave, padrao)
+
+def ler_endereco(texto, host_padrao=HOST_METRICAS_PADRAO):
+    """
+    Interpreta um endereço no formato "porta" ou "host:porta".
+
+    Returns:
+        Par (host, porta), ou None se o texto estiver vazio.
+
+    Raises:
+        ValueError: se a porta não for um número entre 0 e 65535.
+    """
+    texto = str(texto).strip()
+    if not texto:
+        return None
+    host, _, porta = texto.rpartition(":")
+    porta = int(porta)
+    if not 0 <= porta <= 65535:
+        raise ValueError(f"Porta fora do intervalo: {porta}")
+    return host or host_padrao, porta
+
+def _endereco_metricas(segredos):
+    """Endereço de NOTAS_METRICAS; inválido, o app segue sem as métricas (com aviso no log)."""
+    texto = _resolver(segredos, "NOTAS_METRICAS")
+    try:
+        return ler_endereco(texto)
+    except ValueError as e:
+        logger.warning("NOTAS_METRICAS inválido (%r), métricas do Prometheus desativadas: %s", texto, e)
+        return None
+
+def obter_configuracao(ler_segredos=dict):
+    """
+    Retorna a configuração do processo, resolvida na primeira chamada.
+
+    Args:
+        ler_segredos: Função sem argumentos que retorna os Secrets em um
+            dicionário, chamada só na primeira vez (o app passa a leitura
+            do st.secrets; a API não usa Secrets)
+
+    Returns:
+        Configuracao, a mesma em todas as chamadas seguintes.
+
+    Raises:
+        RegistroInvalido: se o arquivo de turmas for inválido (a leitura é
+            tentada de novo na chamada seguinte).
+    """
+    global _configuracao
+    with _lock:
+        if _configuracao is None:
+            load_dotenv()
+            segredos = ler_segredos()
+            registro = carregar_registro(lambda chave: _resolver(segredos, chave))
+            _configuracao = Configuracao(
+                segredos, registro, planilhas_do_registro(registro), _endereco_metricas(segredos)
+            )
+        return _configuracao
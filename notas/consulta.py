@@ -0,0 +1,89 @@
+"""
+Consulta de notas, independente da interface.
+
+Reúne o que o app.py e a API (notas.api) fazem para atender um aluno:
+carregar a turma do cache, procurar a matrícula no índice e descrever o
+resultado. Nada aqui depende do Streamlit.
+"""
+from notas.cache import cache_planilhas
+from notas.esquema import EsquemaInvalido
+from notas.metricas import metricas
+from notas.planilha import STATUS_APROVADO, STATUS_PROVA_FINAL, dados_da_turma, ler_aluno
+from notas.resultados import memo_resultados
+
+# Mensagem exibida ao aluno para cada status
+MENSAGENS_STATUS = {
+    STATUS_APROVADO: "Você está APROVADO! Parabéns!",
+    STATUS_PROVA_FINAL: "Você precisará fazer a PROVA FINAL (AF).",
+}
+
+class ColunaTurmaAusente(EsquemaInvalido):
+    """A turma filtra pela coluna TURMA, mas a planilha não tem essa coluna."""
+
+    def __init__(self, disponiveis):
+        super().__init__(["TURMA"], disponiveis)
+
+def carregar_turma(turma, planilhas, cache=cache_planilhas):
+    """
+    Carrega a turma (notas.registro.Turma) a partir do cache de planilhas.
+
+    Args:
+        turma: Turma do registro
+        planilhas: {url: FontePlanilha} (ver notas.registro.planilhas_do_registro)
+        cache: CacheDePlanilhas de onde ler
+
+    Returns:
+        DadosTurma com as linhas, notas e índice da turma.
+
+    Raises:
+        EsquemaInvalido: se faltarem colunas obrigatórias na planilha.
+        ColunaTurmaAusente: se a turma tem filtro e a planilha não tem TURMA.
+        Exception: erros da busca da planilha, se ela ainda não estiver em cache.
+    """
+    fonte = planilhas[turma.url]
+    entrada = cache.obter_entrada(turma.url, fonte.turmas, fonte.colunas)
+    planilha = entrada.planilha
+    if turma.filtro_turma and not planilha.esquema.turma:
+        raise ColunaTurmaAusente(list(planilha.data.columns))
+    with metricas.medir("filtro", planilha=metricas.planilha(turma.url), turma=turma.codigo):
+        return dados_da_turma(planilha, turma.filtro_turma, entrada.buscada_em, entrada.hash_conteudo)
+
+def buscar_aluno(dados, matricula):
+    """
+    Procura a matrícula (já convertida para int) no índice da turma.
+
+    Returns:
+        Aluno, ou None se a matrícula não estiver na turma.
+    """
+    posicao = dados.indice.get(matricula)
+    return ler_aluno(dados, posicao) if posicao is not None else None
+
+def consultar_aluno(turma, dados, matricula, memo=memo_resultados):
+    """
+    Como buscar_aluno, mas guardando o resultado (inclusive a ausência) por
+    versão da planilha, turma e matrícula (ver notas.resultados).
+    """
+    with metricas.medir("matricula", planilha=metricas.planilha(turma.url), turma=turma.codigo):
+        return memo.obter(
+            turma.url, dados.versao, (turma.rotulo, matricula, "aluno"), lambda: buscar_aluno(dados, matricula)
+        )
+
+def descrever_aluno(aluno, matricula, turma, buscada_em):
+    """Resultado da consulta como dicionário serializável em JSON."""
+    avaliacoes = {
+        "AV 01": {"nota": None if aluno.av_01_faltou else aluno.av_01, "faltou": aluno.av_01_faltou},
+        "AV 02": {"nota": None if aluno.av_02_faltou else aluno.av_02, "faltou": aluno.av_02_faltou},
+    }
+    avaliacoes.update({rotulo: {"nota": nota, "faltou": False} for rotulo, nota in aluno.outras})
+    return {
+        "turma": turma.rotulo,
+        "codigo": turma.codigo,
+        "matricula": matricula,
+        "nome": str(aluno.nome),
+        "avaliacoes": avaliacoes,
+        "media": aluno.media,
+        "status": aluno.status or None,
+        "aprovado": aluno.aprovado,
+        "mensagem": MENSAGENS_STATUS.get(aluno.status),
+        "buscada_em": buscada_em,
+    }
@@ -0,0 +1,105 @@
+"""Resolução do esquema de colunas das planilhas de notas."""
+import re
+from dataclasses import dataclass
+
+class EsquemaInvalido(ValueError):
+    """Colunas obrigatórias ausentes na planilha."""
+
+    def __init__(self, faltando, disponiveis):
+        self.faltando = faltando
+        self.disponiveis = disponiveis
+        super().__init__(f"Colunas não encontradas: {', '.join(faltando)}")
+
+@dataclass(frozen=True)
+class Esquema:
+    """
+    Mapeamento imutável dos papéis da planilha para os nomes das colunas.
+
+    Resolvido uma única vez por carga (ver resolver_esquema) e guardado em
+    cache junto com os dados.
+    """
+    matricula: str
+    nome: str
+    avaliacoes: tuple  # Pares (rótulo, coluna): AV 01, AV 02, AV 03, ..., AF
+    media: str | None = None
+    turma: str | None = None
+
+    def avaliacao(self, rotulo):
+        """Retorna a coluna da avaliação com o rótulo informado (ou None)."""
+        return dict(self.avaliacoes).get(rotulo)
+
+    @property
+    def av01(self):
+        return self.avaliacao("AV 01")
+
+    @property
+    def av02(self):
+        return self.avaliacao("AV 02")
+
+# Avaliações numeradas: "AV 01", "AV. 02", "AV_3", "AVALIAÇÃO 03"...
+PADRAO_AV = re.compile(r'\bAV\w*[\s._-]*(\d{1,2})\b')
+# Avaliação final: "AF", "NOTA AF"...
+PADRAO_AF = re.compile(r'\bAF\b')
+
+# Papéis que podem ser indicados à mão, além das avaliações ("AV 01", "AF"...)
+PAPEIS = ('matricula', 'nome', 'media', 'turma')
+# Rótulos das avaliações, como gerados pela detecção automática
+PADRAO_ROTULO = re.compile(r'AV \d{2}|AF')
+
+def resolver_esquema(colunas, forcadas=None):
+    """
+    Resolve o esquema da planilha a partir dos nomes das colunas.
+
+    Roda uma vez por carga da planilha; a consulta usa o resultado
+    diretamente, sem voltar a procurar colunas.
+
+    Args:
+        colunas: Nomes das colunas da planilha
+        forcadas: Pares (papel, coluna) que dispensam a detecção automática;
+            o papel é um de PAPEIS ou o rótulo de uma avaliação ("AV 01", "AF")
+
+    Raises:
+        EsquemaInvalido: se matrícula, nome, AV 01 ou AV 02 não forem
+            encontradas, ou se uma coluna forçada não existir.
+    """
+    forcadas = dict(forcadas or ())
+    ausentes = [col for col in forcadas.values() if col not in colunas]
+    if ausentes:
+        raise EsquemaInvalido(ausentes, list(colunas))
+
+    papeis = dict.fromkeys(PAPEIS)
+    avaliacoes = {}
+    for col in colunas:
+        if col in forcadas.values():
+            continue
+        col_upper = col.upper()
+        if 'MATRÍCULA' in col_upper or 'MATRICULA' in col_upper:
+            papeis['matricula'] = col
+        elif 'NOME' in col_upper or 'ALUNO' in col_upper:
+            papeis['nome'] = col
+        elif col_upper == 'TURMA':
+            papeis['turma'] = col
+        elif av := PADRAO_AV.search(col_upper):
+            avaliacoes[f"AV {int(av.group(1)):02d}"] = col
+        elif PADRAO_AF.search(col_upper):
+            avaliacoes["AF"] = col
+        elif 'MÉDIA' in col_upper or 'MEDIA' in col_upper:
+            papeis['media'] = col
+
+    for papel, col in forcadas.items():
+        if papel in papeis:
+            papeis[papel] = col
+        else:
+            avaliacoes[papel] = col
+
+    faltando = [papel for papel in ('matricula', 'nome') if not papeis[papel]]
+    faltando += [rotulo for rotulo in ("AV 01", "AV 02") if rotulo not in avaliacoes]
+    if faltando:
+        raise EsquemaInvalido(faltando, list(colunas))
+
+    # Avaliações numeradas em ordem, com a AF por último
+    ordem = sorted(avaliacoes, key=lambda rotulo: (rotulo == "AF", rotulo))
+    return Esquema(
+        avaliacoes=tuple((rotulo, avaliacoes[rotulo]) for rotulo in ordem),
+        **papeis,
+    )
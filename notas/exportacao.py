@@ -0,0 +1,231 @@
+"""
+Consulta em lote e exportação das notas, para a coordenação.
+
+A lista de matrículas (ou a turma inteira) é resolvida de uma vez contra o
+índice da turma, e o resultado é gerado em blocos de linhas: a exportação de
+um curso inteiro não precisa montar a tabela completa em memória. O XLSX
+depende do openpyxl, que é opcional.
+"""
+import csv
+import importlib.util
+import itertools
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from notas.planilha import normalizar_matriculas
+
+# Linhas geradas por bloco na exportação
+LINHAS_POR_BLOCO = 5000
+# Matrículas com mais dígitos que isso não cabem em int64 e são descartadas
+MAXIMO_DIGITOS_MATRICULA = 18
+# XLSX disponível só com o openpyxl instalado
+XLSX_DISPONIVEL = importlib.util.find_spec("openpyxl") is not None
+
+def ler_matriculas(texto):
+    """
+    Extrai as matrículas de um texto colado ou arquivo enviado.
+
+    Usa o primeiro número de cada linha, de modo que listas simples e CSVs
+    com a matrícula na primeira coluna funcionam; linhas sem número (como
+    cabeçalhos) e números com mais de MAXIMO_DIGITOS_MATRICULA dígitos são
+    ignorados.
+
+    Returns:
+        Lista de int, na ordem do texto.
+    """
+    numeros = (re.search(r"\d+", linha) for linha in texto.splitlines())
+    return [
+        int(numero.group()) for numero in numeros
+        if numero and len(numero.group()) <= MAXIMO_DIGITOS_MATRICULA
+    ]
+
+def blocos_de_notas(dados, matriculas=None, linhas_por_bloco=LINHAS_POR_BLOCO, turma=None, colunas=None):
+    """
+    Gera a tabela de notas da turma em blocos de linhas (DataFrames).
+
+    Cada linha traz a matrícula, o nome, a nota e a marca de falta de cada
+    avaliação, a MÉDIA e a situação (APROVADO/PROVA FINAL), como exibidos na
+    consulta individual.
+
+    As matrículas são resolvidas na chamada, antes do primeiro bloco: erros
+    nelas aparecem antes de a resposta começar a ser enviada.
+
+    Args:
+        dados: DadosTurma (ver notas.consulta.carregar_turma)
+        matriculas: Matrículas pedidas, na ordem da saída; as que não estão
+            na turma saem em branco, com 'Encontrada' = 'Não'. None exporta
+            todos os alunos da turma.
+        linhas_por_bloco: Tamanho de cada bloco
+        turma: Rótulo incluído como primeira coluna (exportação de várias turmas)
+        colunas: Colunas de todos os blocos, na ordem (ver colunas_da_exportacao);
+            as avaliações que a turma não tem saem em branco. None usa as
+            colunas da própria turma.
+
+    Returns:
+        Iterador de DataFrames.
+    """
+    if matriculas is None:
+        pedidas = dados.data[dados.esquema.matricula].astype("Int64")
+        posicoes = np.arange(len(pedidas))
+    else:
+        pedidas = normalizar_matriculas(pd.Series(matriculas, dtype="object")).astype("Int64")
+        posicoes = pedidas.map(dados.indice).fillna(-1).to_numpy(dtype="int64")
+    return _blocos(dados, pedidas, posicoes, linhas_por_bloco, matriculas is not None, turma, colunas)
+
+def blocos_de_varias_turmas(turmas, matriculas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Gera a tabela de notas de várias turmas em uma só sequência de blocos.
+
+    Cada linha começa com o rótulo da turma. As turmas podem ter avaliações
+    diferentes (AV 03, AF...): todos os blocos saem com a união das colunas
+    (ver colunas_da_exportacao), e cada turma deixa em branco as que não tem.
+
+    Args:
+        turmas: Pares (rótulo, DadosTurma), na ordem da saída
+        matriculas: Matrículas pedidas em cada turma (ver blocos_de_notas)
+        linhas_por_bloco: Tamanho de cada bloco
+
+    Returns:
+        Iterador de DataFrames.
+    """
+    colunas = colunas_da_exportacao(
+        [dados.esquema for _, dados in turmas], com_turma=True, com_encontrada=matriculas is not None
+    )
+    # Lista, não gerador: as matrículas de todas as turmas são resolvidas já na chamada
+    return itertools.chain.from_iterable([
+        blocos_de_notas(dados, matriculas, linhas_por_bloco, turma=rotulo, colunas=colunas)
+        for rotulo, dados in turmas
+    ])
+
+def colunas_da_exportacao(esquemas, com_turma=False, com_encontrada=False):
+    """
+    Colunas da exportação com as avaliações de todos os esquemas.
+
+    As avaliações que só existem em alguns esquemas entram logo depois da
+    avaliação que as precede neles, de modo que a ordem de cada turma é
+    mantida (AV 01, AV 02, AV 03, AF).
+
+    Returns:
+        Lista com os nomes das colunas, como em blocos_de_notas.
+    """
+    rotulos = []
+    for esquema in esquemas:
+        posicao = 0
+        for rotulo, _ in esquema.avaliacoes:
+            if rotulo in rotulos:
+                posicao = rotulos.index(rotulo) + 1
+            else:
+                rotulos.insert(posicao, rotulo)
+                posicao += 1
+
+    colunas = ["Turma"] if com_turma else []
+    colunas += ["Matrícula", "Nome"]
+    for rotulo in rotulos:
+        colunas += [rotulo, f"{rotulo} faltou"]
+    colunas += ["MÉDIA", "Situação"]
+    if com_encontrada:
+        colunas.append("Encontrada")
+    return colunas
+
+def _blocos(dados, pedidas, posicoes, linhas_por_bloco, com_encontrada, turma, colunas):
+    for inicio in range(0, len(posicoes), linhas_por_bloco):
+        fatia = slice(inicio, inicio + linhas_por_bloco)
+        bloco = _bloco(dados, pedidas.iloc[fatia].to_numpy(), posicoes[fatia], com_encontrada, turma)
+        yield bloco if colunas is None else bloco.reindex(columns=colunas, fill_value="")
+
+def _bloco(dados, matriculas, posicoes, com_encontrada, turma):
+    encontradas = posicoes >= 0
+    linhas = posicoes[encontradas]
+
+    def coluna(serie, vazio=""):
+        valores = np.full(len(posicoes), vazio, dtype=object)
+        valores[encontradas] = serie.iloc[linhas].to_numpy(dtype=object)
+        return valores
+
+    def sim_nao(marcas):
+        return np.where(marcas, "Sim", "Não")
+
+    tabela = {} if turma is None else {"Turma": turma}
+    tabela["Matrícula"] = matriculas
+    tabela["Nome"] = coluna(dados.data[dados.esquema.nome])
+    for rotulo, _ in dados.esquema.avaliacoes:
+        faltou = coluna(dados.notas[f"{rotulo} faltou"], False).astype(bool)
+        tabela[rotulo] = np.where(faltou, "", coluna(dados.notas[f"{rotulo} texto"]))
+        tabela[f"{rotulo} faltou"] = np.where(encontradas, sim_nao(faltou), "")
+    tabela["MÉDIA"] = coluna(dados.notas["MÉDIA texto"])
+    tabela["Situação"] = coluna(dados.notas["STATUS"].astype(str))
+    if com_encontrada:
+        tabela["Encontrada"] = sim_nao(encontradas)
+    return pd.DataFrame(tabela)
+
+def exportar_csv(blocos):
+    """
+    Converte os blocos (ver blocos_de_notas) em pedaços de texto CSV.
+
+    O cabeçalho sai no primeiro bloco; o separador é ';' e o texto começa
+    com BOM, para abrir direto no Excel com acentos.
+    """
+    primeiro = True
+    for bloco in blocos:
+        yield ("\ufeff" if primeiro else "") + bloco.to_csv(
+            index=False, header=primeiro, sep=";", quoting=csv.QUOTE_MINIMAL
+        )
+        primeiro = False
+
+def exportar_xlsx(blocos, destino):
+    """
+    Grava os blocos (ver blocos_de_notas) em uma planilha XLSX.
+
+    Usa o modo de escrita do openpyxl que grava as linhas à medida que
+    chegam, sem manter a planilha inteira em memória.
+
+    Args:
+        blocos: Blocos de linhas
+        destino: Arquivo binário aberto para escrita
+
+    Raises:
+        RuntimeError: se o openpyxl não estiver instalado.
+    """
+    if not XLSX_DISPONIVEL:
+        raise RuntimeError("Exportação em XLSX requer o pacote openpyxl")
+    from openpyxl import Workbook
+
+    pasta = Workbook(write_only=True)
+    aba = pasta.create_sheet("Notas")
+    primeiro = True
+    for bloco in blocos:
+        if primeiro:
+            aba.append(list(bloco.columns))
+            primeiro = False
+        for linha in bloco.itertuples(index=False):
+            aba.append([None if pd.isna(valor) else valor for valor in linha])
+    pasta.save(destino)
+
+def exportar_para_arquivo(blocos, formato):
+    """
+    Grava a exportação em um arquivo temporário (em memória enquanto pequeno).
+
+    Returns:
+        Arquivo binário posicionado no início.
+    """
+    arquivo = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    if formato == "xlsx":
+        exportar_xlsx(blocos, arquivo)
+    else:
+        for pedaco in exportar_csv(blocos):
+            arquivo.write(pedaco.encode())
+    arquivo.seek(0)
+    return arquivo
+
+def exportar_para_bytes(blocos, formato):
+    """
+    Gera a exportação inteira em bytes.
+
+    Para o st.download_button, que lê o arquivo todo em memória e não aceita
+    o arquivo temporário de exportar_para_arquivo.
+    """
+    with exportar_para_arquivo(blocos, formato) as arquivo:
+        return arquivo.read()
@@ -0,0 +1,114 @@
+"""
+Índice global de matrículas, cobrindo todas as turmas do registro.
+
+Permite encontrar um aluno sem saber a turma: cada matrícula aponta para as
+turmas em que aparece e a posição da linha em cada uma. O índice é mantido a
+partir das notificações do cache (CacheDePlanilhas.assinar): quando uma
+planilha muda, só as matrículas dela são retiradas e reinseridas, sem
+percorrer as demais planilhas.
+"""
+import threading
+from typing import NamedTuple
+
+from notas.cache import cache_planilhas
+from notas.planilha import dados_da_turma, ler_aluno
+
+class Ocorrencia(NamedTuple):
+    """Registro de um aluno em uma das turmas do registro."""
+    rotulo: str  # Rótulo da turma (ver notas.registro.Turma)
+    aluno: object  # notas.planilha.Aluno
+    buscada_em: float  # time.time() da busca da planilha no servidor
+
+class IndiceGlobal:
+    """
+    Matrícula -> turmas em que aparece, em todas as planilhas do registro.
+
+    Args:
+        cache: CacheDePlanilhas cujas planilhas são indexadas
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._turmas = {}  # URL -> Turmas do registro que usam a planilha
+        self._indexadas = {}  # URL -> (Entrada indexada, {rótulo: índice da turma})
+        self._matriculas = {}  # Matrícula -> {rótulo: posição na turma}
+        self._lock = threading.Lock()
+        cache.assinar(self._nova_versao)
+
+    def configurar(self, registro):
+        """
+        Define as turmas indexadas (ver notas.registro.carregar_registro).
+
+        Pode ser chamado a cada execução do app: só turmas novas são
+        incluídas, com as planilhas que já estiverem em cache.
+        """
+        novas = [turma for turma in registro.values() if turma.url]
+        with self._lock:
+            conhecidas = {turma for turmas in self._turmas.values() for turma in turmas}
+            novas = [turma for turma in novas if turma not in conhecidas]
+            for turma in novas:
+                self._turmas.setdefault(turma.url, []).append(turma)
+
+        em_cache = self._cache.situacao()
+        for url in {turma.url for turma in novas} & em_cache.keys():
+            self._nova_versao(url, em_cache[url])
+
+    def buscar(self, matricula):
+        """
+        Retorna os registros do aluno em todas as turmas, na ordem do registro.
+
+        Args:
+            matricula: Matrícula já convertida para int
+
+        Returns:
+            Lista de Ocorrencia (vazia se a matrícula não estiver em nenhuma turma).
+        """
+        with self._lock:
+            posicoes = dict(self._matriculas.get(matricula, {}))
+            entradas = {
+                turma.rotulo: (turma, self._indexadas[url][0])
+                for url, turmas in self._turmas.items() if url in self._indexadas
+                for turma in turmas
+            }
+
+        em_cache = self._cache.situacao()
+        ocorrencias = []
+        for rotulo, (turma, entrada) in entradas.items():
+            if rotulo in posicoes:
+                atual = em_cache.get(turma.url)
+                if atual is not None and atual.planilha is entrada.planilha:
+                    entrada = atual  # Mesma versão, revalidada depois de indexada
+                dados = dados_da_turma(entrada.planilha, turma.filtro_turma, entrada.buscada_em)
+                ocorrencias.append(Ocorrencia(rotulo, ler_aluno(dados, posicoes[rotulo]), entrada.buscada_em))
+        return ocorrencias
+
+    def _nova_versao(self, url, entrada):
+        """Troca as matrículas da planilha da URL pelas da nova versão."""
+        with self._lock:
+            turmas = self._turmas.get(url)
+            indexada, antigos = self._indexadas.get(url, (None, {}))
+            if not turmas or (indexada is not None and indexada.buscada_em > entrada.buscada_em):
+                return
+            novos = {
+                turma.rotulo: entrada.planilha.indices.get(turma.filtro_turma or None, {})
+                for turma in turmas
+            }
+            if novos.keys() == antigos.keys() and all(novos[r] is antigos[r] for r in novos):
+                # Índices reaproveitados da versão anterior: as posições não mudaram
+                self._indexadas[url] = (entrada, novos)
+                return
+
+            for rotulo, indice in antigos.items():
+                for matricula in indice:
+                    turmas_do_aluno = self._matriculas[matricula]
+                    del turmas_do_aluno[rotulo]
+                    if not turmas_do_aluno:
+                        del self._matriculas[matricula]
+            for rotulo, indice in novos.items():
+                for matricula, posicao in indice.items():
+                    self._matriculas.setdefault(matricula, {})[rotulo] = posicao
+
+            self._indexadas[url] = (entrada, novos)
+
+# Índice único do processo, sobre o cache compartilhado
+indice_global = IndiceGlobal(cache_planilhas)
@@ -0,0 +1,277 @@
+"""
+Métricas de tempo e contadores das etapas da consulta.
+
+Cada etapa (busca da planilha, leitura do CSV, detecção das colunas, cálculo
+das notas, filtro da turma, consulta da matrícula, montagem do cartão) é
+medida com metricas.medir, com rótulos da planilha e da turma. Os rótulos
+definidos com metricas.rotulos valem para as medições feitas dentro do
+bloco, inclusive nas funções chamadas por ele, o que permite rotular as
+etapas internas de notas.planilha sem passar a planilha adiante.
+
+As medições ficam em memória no processo: contagem, soma e faixas de duração
+(para o formato de texto do Prometheus) e as últimas amostras de cada série,
+das quais saem os percentis da página de diagnóstico. O custo por medição é
+de alguns microssegundos, para que fique sempre ligado.
+"""
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Limites das faixas de duração, em segundos
+LIMITES_DURACAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Últimas amostras guardadas por série, para os percentis
+AMOSTRAS_POR_SERIE = 1024
+# Tipo de conteúdo do formato de texto do Prometheus
+TIPO_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# Descrição dos contadores (nome -> texto do HELP)
+CONTADORES = {
+    "notas_cache_consultas_total": "Consultas ao cache de planilhas, por resultado (acerto, vencida, ausente)",
+    "notas_buscas_total": "Buscas de planilhas no servidor, por resultado",
+    "notas_resultados_total": "Consultas à memória de resultados dos alunos (acerto, falta)",
+}
+
+_rotulos_atuais = ContextVar("rotulos_metricas", default={})
+
+class _Serie:
+    """Durações de uma etapa com um conjunto de rótulos."""
+
+    __slots__ = ("faixas", "soma", "contagem", "amostras")
+
+    def __init__(self, limites, amostras):
+        self.faixas = [0] * (len(limites) + 1)  # A última é a +Inf
+        self.soma = 0.0
+        self.contagem = 0
+        self.amostras = deque(maxlen=amostras)
+
+class Metricas:
+    """
+    Registro de durações e contadores do processo.
+
+    Args:
+        limites: Limites das faixas de duração (segundos), em ordem crescente
+        amostras: Últimas amostras guardadas por série, para os percentis
+    """
+
+    def __init__(self, limites=LIMITES_DURACAO, amostras=AMOSTRAS_POR_SERIE):
+        self.limites = limites
+        self.amostras = amostras
+        self._series = {}  # (etapa, rótulos) -> _Serie
+        self._contadores = {}  # (nome, rótulos) -> valor
+        self._planilhas = {}  # URL -> nome da planilha nos rótulos
+        self._coletores = []  # Funções que produzem medidas no momento da exportação
+        self._servidor = None
+        self._falha_servidor = None  # Erro ao abrir o servidor de /metrics (não é tentado de novo)
+        self._lock = threading.Lock()
+
+    def nomear_planilhas(self, registro):
+        """
+        Define o nome de cada planilha nos rótulos, a partir dos códigos das
+        turmas que a usam (ver notas.registro); as URLs não são expostas.
+        """
+        codigos = {}
+        for turma in registro.values():
+            if turma.url:
+                codigos.setdefault(turma.url, []).append(turma.codigo)
+        with self._lock:
+            self._planilhas.update({url: "+".join(nomes) for url, nomes in codigos.items()})
+
+    def planilha(self, url):
+        """Nome da planilha da URL nos rótulos (um resumo da URL, se não foi nomeada)."""
+        nome = self._planilhas.get(url)
+        if nome is None:
+            nome = "planilha-" + hashlib.sha256(url.encode()).hexdigest()[:8]
+        return nome
+
+    @contextmanager
+    def rotulos(self, **rotulos):
+        """Aplica os rótulos às medições feitas dentro do bloco."""
+        token = _rotulos_atuais.set({**_rotulos_atuais.get(), **rotulos})
+        try:
+            yield
+        finally:
+            _rotulos_atuais.reset(token)
+
+    @contextmanager
+    def medir(self, etapa, **rotulos):
+        """Mede a duração do bloco como uma amostra da etapa."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio, **rotulos)
+
+    def registrar(self, etapa, segundos, **rotulos):
+        """Registra uma duração já medida (em segundos) da etapa."""
+        chave = (etapa, self._chave_rotulos(rotulos))
+        faixa = bisect.bisect_left(self.limites, segundos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _Serie(self.limites, self.amostras)
+            serie.faixas[faixa] += 1
+            serie.soma += segundos
+            serie.contagem += 1
+            serie.amostras.append(segundos)
+
+    def contar(self, nome, quantidade=1, **rotulos):
+        """Soma quantidade ao contador (ver CONTADORES)."""
+        chave = (nome, self._chave_rotulos(rotulos))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + quantidade
+
+    def adicionar_coletor(self, coletor):
+        """
+        Registra uma função chamada a cada exportação, para medidas que são
+        lidas na hora (ex: idade e linhas das planilhas em cache).
+
+        A função retorna tuplas (nome, ajuda, rotulos, valor).
+        """
+        self._coletores.append(coletor)
+
+    def duracoes(self):
+        """
+        Resumo das durações de cada série, para a página de diagnóstico.
+
+        Returns:
+            Lista de dicionários com a etapa, os rótulos, a contagem, a média
+            e os percentis 50, 95 e 99 (em milissegundos) das últimas amostras.
+        """
+        with self._lock:
+            series = [(etapa, dict(rotulos), serie.contagem, serie.soma, list(serie.amostras))
+                      for (etapa, rotulos), serie in self._series.items()]
+        resumo = []
+        for etapa, rotulos, contagem, soma, amostras in sorted(series, key=lambda s: (s[0], sorted(s[1].items()))):
+            amostras.sort()
+            p50, p95, p99 = (_percentil(amostras, q) * 1000 for q in (0.5, 0.95, 0.99))
+            resumo.append({
+                "etapa": etapa, **rotulos, "contagem": contagem,
+                "media_ms": soma / contagem * 1000, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+            })
+        return resumo
+
+    def contadores(self):
+        """Retorna os contadores como tuplas (nome, rótulos, valor)."""
+        with self._lock:
+            return [(nome, dict(rotulos), valor) for (nome, rotulos), valor in self._contadores.items()]
+
+    def taxa_de_acerto(self, nome="notas_cache_consultas_total", acertos=("acerto",), **filtro):
+        """Fração das consultas do contador que foram acertos (None sem consultas)."""
+        total = acertados = 0
+        for contador, rotulos, valor in self.contadores():
+            if contador == nome and all(rotulos.get(k) == v for k, v in filtro.items()):
+                total += valor
+                if rotulos.get("resultado") in acertos:
+                    acertados += valor
+        return acertados / total if total else None
+
+    def texto_prometheus(self):
+        """Exporta as métricas no formato de texto do Prometheus."""
+        linhas = ["# HELP notas_etapa_duracao_segundos Duração de cada etapa da consulta",
+                  "# TYPE notas_etapa_duracao_segundos histogram"]
+        with self._lock:
+            series = [(etapa, rotulos, list(serie.faixas), serie.soma, serie.contagem)
+                      for (etapa, rotulos), serie in self._series.items()]
+            contadores = sorted(self._contadores.items())
+        for etapa, rotulos, faixas, soma, contagem in sorted(series):
+            rotulos = (("etapa", etapa), *rotulos)
+            acumulado = 0
+            for limite, quantidade in zip((*self.limites, "+Inf"), faixas):
+                acumulado += quantidade
+                linhas.append(f"notas_etapa_duracao_segundos_bucket{_formatar(rotulos + (('le', limite),))} {acumulado}")
+            linhas.append(f"notas_etapa_duracao_segundos_sum{_formatar(rotulos)} {soma!r}")
+            linhas.append(f"notas_etapa_duracao_segundos_count{_formatar(rotulos)} {contagem}")
+
+        declarados = set()
+        for (nome, rotulos), valor in contadores:
+            if nome not in declarados:
+                declarados.add(nome)
+                linhas += [f"# HELP {nome} {CONTADORES.get(nome, nome)}", f"# TYPE {nome} counter"]
+            linhas.append(f"{nome}{_formatar(rotulos)} {valor}")
+
+        medidas = {}
+        for coletor in list(self._coletores):
+            for nome, ajuda, rotulos, valor in coletor():
+                medidas.setdefault((nome, ajuda), []).append((rotulos, valor))
+        for (nome, ajuda), valores in medidas.items():
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+            linhas += [f"{nome}{_formatar(tuple(rotulos.items()))} {valor!r}" for rotulos, valor in valores]
+        return "\n".join(linhas) + "\n"
+
+    def servir(self, endereco):
+        """
+        Atende GET /metrics em uma thread do processo, para o Prometheus.
+
+        Pode ser chamado a cada execução do app: só a primeira tenta iniciar
+        o servidor. Se a porta estiver ocupada (por outra réplica do app, por
+        exemplo) ou o endereço for inválido, a falha vai para o log e não é
+        tentada de novo: o processo segue sem o exportador.
+
+        Args:
+            endereco: Par (host, porta)
+
+        Returns:
+            True se o servidor de /metrics está atendendo.
+        """
+        with self._lock:
+            if self._servidor is not None or self._falha_servidor is not None:
+                return self._servidor is not None
+            metricas = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(HTTPStatus.NOT_FOUND)
+                        return
+                    conteudo = metricas.texto_prometheus().encode()
+                    self.send_response(HTTPStatus.OK)
+                    self.send_header("Content-Type", TIPO_PROMETHEUS)
+                    self.send_header("Content-Length", str(len(conteudo)))
+                    self.end_headers()
+                    self.wfile.write(conteudo)
+
+                def log_message(self, formato, *args):
+                    pass
+
+            try:
+                self._servidor = ThreadingHTTPServer(endereco, Handler)
+            except (OSError, ValueError, OverflowError) as e:
+                self._falha_servidor = e
+                logger.warning("Métricas do Prometheus desativadas: não foi possível atender em %s: %s", endereco, e)
+                return False
+            self._servidor.daemon_threads = True
+            threading.Thread(target=self._servidor.serve_forever, name="metricas", daemon=True).start()
+            return True
+
+    def _chave_rotulos(self, rotulos):
+        atuais = _rotulos_atuais.get()
+        if atuais:
+            rotulos = {**atuais, **rotulos}
+        return tuple(sorted(rotulos.items()))
+
+def _percentil(ordenadas, q):
+    """Percentil q (entre 0 e 1) das amostras ordenadas, com interpolação linear."""
+    posicao = (len(ordenadas) - 1) * q
+    abaixo = int(posicao)
+    acima = min(abaixo + 1, len(ordenadas) - 1)
+    return ordenadas[abaixo] + (ordenadas[acima] - ordenadas[abaixo]) * (posicao - abaixo)
+
+def _formatar(rotulos):
+    """Rótulos no formato {chave="valor",...} do Prometheus."""
+    if not rotulos:
+        return ""
+    def escapar(valor):
+        return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{chave}="{escapar(valor)}"' for chave, valor in rotulos) + "}"
+
+# Métricas únicas do processo
+metricas = Metricas()
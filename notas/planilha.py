@@ -0,0 +1,415 @@
+"""Processamento das planilhas: notas calculadas, partições por turma e índices."""
+import io
+import logging
+import sys
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from notas.esquema import Esquema, resolver_esquema
+from notas.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Nota mínima para aprovação direta
+MEDIA_APROVACAO = 7.0
+
+# Planilhas maiores que isto (em bytes) são lidas em blocos de linhas
+LIMITE_LEITURA_EM_BLOCOS = 8 * 1024 * 1024
+LINHAS_POR_BLOCO = 50_000
+
+# Códigos de status calculados para cada aluno
+STATUS_APROVADO = "APROVADO"
+STATUS_PROVA_FINAL = "PROVA FINAL"
+STATUS_INDEFINIDO = ""
+
+class Aluno(NamedTuple):
+    """Registro leve com os valores já calculados de um aluno."""
+    nome: object
+    av_01: str  # Notas formatadas com 1 casa decimal
+    av_02: str
+    media: str
+    av_01_faltou: bool
+    av_02_faltou: bool
+    status: str  # STATUS_APROVADO, STATUS_PROVA_FINAL ou STATUS_INDEFINIDO
+    outras: tuple = ()  # Pares (rótulo, nota formatada) das demais avaliações feitas
+
+    @property
+    def aprovado(self):
+        """True/False conforme o status, ou None se a média não for numérica."""
+        return {STATUS_APROVADO: True, STATUS_PROVA_FINAL: False}.get(self.status)
+
+class Alteracao(NamedTuple):
+    """Linhas de uma turma que mudaram de uma versão da planilha para a seguinte."""
+    inseridas: int
+    alteradas: int
+    removidas: int
+
+    @property
+    def total(self):
+        return self.inseridas + self.alteradas + self.removidas
+
+class Planilha(NamedTuple):
+    """Planilha carregada, com esquema, partições por turma e índices."""
+    data: pd.DataFrame
+    notas: pd.DataFrame  # Valores calculados por enriquecer_notas, alinhados com data
+    esquema: Esquema
+    particoes: dict  # TURMA -> slice das linhas em data (ordenada por TURMA)
+    indices: dict  # None (planilha inteira) ou TURMA -> índice de matrículas
+    hashes: np.ndarray  # Hash do conteúdo de cada linha de data
+    alteracoes: dict | None = None  # TURMA (None sem a coluna) -> Alteracao, em relação à versão anterior
+
+class DadosTurma(NamedTuple):
+    """Visão de uma turma: suas linhas da planilha, notas calculadas e índice."""
+    data: pd.DataFrame
+    notas: pd.DataFrame
+    esquema: Esquema
+    indice: dict
+    buscada_em: float  # time.time() da última busca da planilha no servidor
+    versao: str = ""  # Hash do conteúdo da planilha (ver notas.cache.Entrada)
+
+def formatar_notas(numeros, brutos):
+    """Formata as notas com 1 casa decimal; valores não numéricos ficam como texto."""
+    # As notas são guardadas em float32; arredondar para 4 casas em float64
+    # recupera o valor digitado na planilha antes de formatar
+    valores = np.round(numeros.to_numpy(dtype='float64'), 4)
+    texto = np.char.mod('%.1f', valores)
+    return pd.Series(np.where(numeros.notna(), texto, brutos.astype(str)), index=numeros.index, dtype='str')
+
+def enriquecer_notas(data, esquema):
+    """
+    Calcula de uma vez, para todas as linhas, os valores usados na consulta.
+
+    Para cada avaliação do esquema gera a nota numérica (coluna com o próprio
+    rótulo, ex: 'AV 01'), a marca de falta ('AV 01 faltou') e o texto
+    formatado ('AV 01 texto'). Também gera 'MÉDIA' (da planilha ou
+    (AV 01 + AV 02) / 2), 'MÉDIA texto' e o código de 'STATUS'.
+
+    Returns:
+        DataFrame com o mesmo índice de data.
+    """
+    notas = {}
+    for rotulo, col in esquema.avaliacoes:
+        brutos = data[col]
+        numeros = pd.to_numeric(brutos, errors='coerce').astype('float32')
+        faltou = numeros.isna() | (numeros == 0)
+        if not pd.api.types.is_numeric_dtype(brutos):
+            # Coluna com texto (ex: "AUS"): o texto é exibido no lugar da nota
+            texto = brutos.astype(str).str.strip().str.upper()
+            faltou = brutos.isna() | (numeros == 0) | (texto == '') | (texto == '#N/A')
+        notas[rotulo] = numeros
+        notas[f"{rotulo} faltou"] = faltou
+        notas[f"{rotulo} texto"] = formatar_notas(numeros, brutos)
+
+    if esquema.media:
+        # Usar média da planilha
+        media_bruta = data[esquema.media]
+        media = pd.to_numeric(media_bruta, errors='coerce').astype('float32')
+    else:
+        # Calcular média (AV01 + AV02) / 2
+        media = (notas["AV 01"].fillna(0) + notas["AV 02"].fillna(0)) / 2
+        media_bruta = media
+    notas["MÉDIA"] = media
+    notas["MÉDIA texto"] = formatar_notas(media, media_bruta)
+    media_exata = np.round(media.to_numpy(dtype='float64'), 4)
+    notas["STATUS"] = pd.Categorical(
+        np.select(
+            [media_exata >= MEDIA_APROVACAO, media_exata < MEDIA_APROVACAO],
+            [STATUS_APROVADO, STATUS_PROVA_FINAL],
+            STATUS_INDEFINIDO,
+        ),
+        categories=[STATUS_APROVADO, STATUS_PROVA_FINAL, STATUS_INDEFINIDO],
+    )
+
+    return pd.DataFrame(notas, index=data.index)
+
+def resumir_notas(notas, esquema):
+    """
+    Indicadores agregados de uma turma (ou planilha), lidos das notas já calculadas.
+
+    Returns:
+        Dicionário com total de alunos, aprovados, taxa de aprovação e
+        quantidade de faltas por avaliação.
+    """
+    total = len(notas)
+    aprovados = int((notas["STATUS"] == STATUS_APROVADO).sum())
+    return {
+        "alunos": total,
+        "aprovados": aprovados,
+        "prova_final": int((notas["STATUS"] == STATUS_PROVA_FINAL).sum()),
+        "taxa_aprovacao": aprovados / total if total else 0.0,
+        "faltas": {
+            rotulo: int(notas[f"{rotulo} faltou"].sum())
+            for rotulo, _ in esquema.avaliacoes
+        },
+    }
+
+def construir_indice(matriculas, descricao):
+    """
+    Constrói o índice matrícula normalizada -> posição da linha.
+
+    Matrículas duplicadas são registradas no log uma única vez, durante a
+    construção; a consulta sempre retorna a primeira ocorrência.
+
+    Args:
+        matriculas: Coluna de matrícula (já normalizada), na ordem das linhas
+        descricao: Identificação da planilha/turma usada no log
+    """
+    chaves = pd.to_numeric(pd.Series(matriculas, copy=False), errors='coerce')
+    validas = chaves.notna().to_numpy()
+    posicoes = validas.nonzero()[0].tolist()
+    chaves = chaves[validas].astype('int64').tolist()
+
+    # Percorrer de trás para frente mantém a primeira ocorrência de cada chave
+    indice = dict(zip(reversed(chaves), reversed(posicoes)))
+
+    if len(indice) < len(chaves):
+        vistas = set()
+        duplicadas = sorted({c for c in chaves if c in vistas or vistas.add(c)})
+        logger.warning("Matrículas duplicadas em %s: %s", descricao, duplicadas)
+
+    return indice
+
+def dados_da_turma(planilha, filtro_turma, buscada_em, versao=""):
+    """
+    Recorta da planilha a turma informada (ou a planilha inteira, sem filtro).
+
+    As linhas e notas da turma são uma fatia da planilha, sem cópia. Turmas
+    ausentes da planilha resultam em uma visão vazia.
+    """
+    data, notas = planilha.data, planilha.notas
+    if filtro_turma:
+        fatia = planilha.particoes.get(filtro_turma, slice(0, 0))
+        data, notas = data.iloc[fatia], notas.iloc[fatia]
+    indice = planilha.indices.get(filtro_turma or None, {})
+    return DadosTurma(data, notas, planilha.esquema, indice, buscada_em, versao)
+
+def ler_aluno(dados, posicao):
+    """Monta o registro do aluno que está na posição informada da turma."""
+    notas = dados.notas
+
+    def valor(col):
+        return notas[col].iat[posicao]
+
+    return Aluno(
+        nome=dados.data[dados.esquema.nome].iat[posicao],
+        av_01=valor("AV 01 texto"),
+        av_02=valor("AV 02 texto"),
+        media=valor("MÉDIA texto"),
+        av_01_faltou=bool(valor("AV 01 faltou")),
+        av_02_faltou=bool(valor("AV 02 faltou")),
+        status=valor("STATUS"),
+        outras=tuple(
+            (rotulo, valor(f"{rotulo} texto"))
+            for rotulo, _ in dados.esquema.avaliacoes
+            if rotulo not in ("AV 01", "AV 02") and not valor(f"{rotulo} faltou")
+        ),
+    )
+
+def memoria_planilha(planilha):
+    """
+    Relatório de memória de uma planilha em cache, em bytes.
+
+    O tamanho dos índices considera só as tabelas hash (não as chaves).
+    """
+    return {
+        "linhas": len(planilha.data),
+        "dados": int(planilha.data.memory_usage(deep=True).sum()),
+        "notas": int(planilha.notas.memory_usage(deep=True).sum()),
+        "indices": sum(sys.getsizeof(indice) for indice in planilha.indices.values()),
+        "hashes": planilha.hashes.nbytes,
+    }
+
+def normalizar_matriculas(valores):
+    """
+    Converte as matrículas para inteiro compacto (Int32 quando cabem), com NA
+    nas inválidas (não inteiras ou fora do intervalo do int64).
+    """
+    chaves = pd.to_numeric(valores, errors='coerce')
+    chaves = chaves.where((chaves == chaves.round()) & (chaves.abs() < 2**63))
+    maior = chaves.abs().max()
+    return chaves.astype('Int32' if pd.isna(maior) or maior < 2**31 else 'Int64')
+
+def processar_planilha(conteudo, turmas=None, colunas=None, anterior=None):
+    """
+    Processa o CSV baixado de uma planilha do Google Sheets.
+
+    O cabeçalho é lido primeiro para resolver o esquema; do corpo são lidas
+    só as colunas do esquema (matrícula, nome, TURMA, avaliações e MÉDIA),
+    com tipos explícitos: notas e MÉDIA em float32 (#N/A e células vazias
+    viram NaN já na leitura) e TURMA como categoria. Planilhas grandes são
+    lidas em blocos, descartando em cada bloco as linhas de outras turmas.
+
+    Args:
+        conteudo: Bytes do CSV
+        turmas: Valores de TURMA a manter (None mantém todas as linhas)
+        colunas: Pares (papel, coluna) indicados na configuração (ver resolver_esquema)
+        anterior: Planilha da versão anterior, para reaproveitar o que não mudou
+
+    Returns:
+        Planilha (ver montar_planilha).
+
+    Raises:
+        EsquemaInvalido: se faltarem colunas obrigatórias.
+    """
+    with metricas.medir("esquema"):
+        cabecalho = pd.read_csv(io.BytesIO(conteudo), nrows=0).columns
+        originais = dict(zip(cabecalho.str.strip(), cabecalho))
+        esquema = resolver_esquema(list(originais), colunas)
+
+    lidas = [esquema.matricula, esquema.nome, esquema.turma, esquema.media]
+    lidas += [col for _, col in esquema.avaliacoes]
+    lidas = [originais[col] for col in lidas if col]
+
+    tipos = {originais[col]: 'float32' for _, col in esquema.avaliacoes}
+    if esquema.media:
+        tipos[originais[esquema.media]] = 'float32'
+    col_turma = originais.get(esquema.turma)
+    if col_turma:
+        # Com as turmas conhecidas, valores de outras turmas já viram NaN na leitura
+        tipos[col_turma] = pd.CategoricalDtype(sorted(turmas)) if turmas else 'category'
+
+    with metricas.medir("leitura"):
+        try:
+            data = _ler_corpo(conteudo, lidas, tipos, col_turma if turmas else None)
+        except ValueError:
+            # Alguma nota com texto (ex: "AUS"): as notas ficam com o tipo inferido
+            tipos = {col: tipo for col, tipo in tipos.items() if tipo != 'float32'}
+            data = _ler_corpo(conteudo, lidas, tipos, col_turma if turmas else None)
+
+    # Normalizar nomes das colunas
+    data.columns = data.columns.str.strip()
+    with metricas.medir("calculo"):
+        return montar_planilha(data, esquema, anterior)
+
+def _ler_corpo(conteudo, colunas, tipos, col_turma):
+    """Lê as colunas informadas, em blocos se a planilha for grande, filtrando por TURMA."""
+    opcoes = {'usecols': colunas, 'dtype': tipos}
+    if len(conteudo) <= LIMITE_LEITURA_EM_BLOCOS:
+        blocos = [pd.read_csv(io.BytesIO(conteudo), **opcoes)]
+    else:
+        blocos = pd.read_csv(io.BytesIO(conteudo), chunksize=LINHAS_POR_BLOCO, **opcoes)
+
+    if col_turma:
+        blocos = (bloco[bloco[col_turma].notna()] for bloco in blocos)
+    return pd.concat(blocos, ignore_index=True)
+
+def montar_planilha(data, esquema=None, anterior=None):
+    """
+    Monta a Planilha a partir dos dados já lidos (do CSV ou de um snapshot).
+
+    Planilhas consolidadas (com coluna TURMA) são ordenadas e particionadas
+    por turma em uma única passada, para que todas as turmas que
+    compartilham a mesma planilha reutilizem o mesmo download; cada turma é
+    uma fatia contígua das linhas, sem cópia. O esquema de colunas, as notas
+    calculadas e o índice de matrículas de cada partição são resolvidos aqui
+    e ficam em cache junto com os dados.
+
+    Com a versão anterior da planilha, as linhas são comparadas pelo hash do
+    conteúdo, usando a matrícula como chave (ver comparar_linhas): só as
+    linhas inseridas ou alteradas têm as notas recalculadas, e os índices
+    são reaproveitados se as matrículas continuam nas mesmas posições.
+
+    Returns:
+        Planilha. Os índices usam posições relativas à respectiva partição.
+
+    Raises:
+        EsquemaInvalido: se faltarem colunas obrigatórias.
+    """
+    esquema = esquema or resolver_esquema(data.columns)
+    data = data.assign(**{esquema.matricula: normalizar_matriculas(data[esquema.matricula])})
+
+    particoes = {}
+    if esquema.turma:
+        data[esquema.turma] = data[esquema.turma].astype('category')
+        data = data.sort_values(esquema.turma, kind='stable', ignore_index=True)
+        codigos = data[esquema.turma].cat.codes.to_numpy()
+        categorias = data[esquema.turma].cat.categories
+        inicios = np.r_[0, np.flatnonzero(np.diff(codigos)) + 1] if len(codigos) else []
+        fins = np.r_[inicios[1:], len(codigos)] if len(codigos) else []
+        particoes = {
+            categorias[codigos[inicio]]: slice(int(inicio), int(fim))
+            for inicio, fim in zip(inicios, fins)
+            if codigos[inicio] >= 0  # Linhas sem TURMA
+        }
+
+    hashes = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    comparacao = comparar_linhas(anterior, data, esquema, hashes)
+    if comparacao is None:
+        notas, alteracoes = enriquecer_notas(data, esquema), None
+    else:
+        posicoes_anteriores, mudou, alteracoes = comparacao
+        iguais = np.flatnonzero(~mudou)
+        notas = anterior.notas.iloc[posicoes_anteriores[iguais]].set_axis(data.index[iguais])
+        if mudou.any():
+            notas = pd.concat([notas, enriquecer_notas(data[mudou], esquema)]).reindex(data.index)
+
+    mesmas_posicoes = (
+        comparacao is not None
+        and len(posicoes_anteriores) == len(anterior.data)
+        and (posicoes_anteriores == np.arange(len(posicoes_anteriores))).all()
+        and particoes == anterior.particoes
+    )
+    if mesmas_posicoes:
+        # Mesmas matrículas nas mesmas posições: os índices continuam válidos
+        indices = anterior.indices
+    else:
+        matriculas = data[esquema.matricula]
+        indices = {None: construir_indice(matriculas, "planilha")}
+        for turma, fatia in particoes.items():
+            indices[turma] = construir_indice(matriculas.iloc[fatia], f"turma {turma}")
+
+    return Planilha(data, notas, esquema, particoes, indices, hashes, alteracoes)
+
+def comparar_linhas(anterior, data, esquema, hashes):
+    """
+    Compara as linhas da nova versão da planilha com as da anterior.
+
+    Cada linha é identificada pela matrícula e pela ordem de ocorrência dela
+    (linhas repetidas ou sem matrícula também são pareadas) e considerada
+    alterada se o hash do conteúdo mudou.
+
+    Returns:
+        Tupla (posicoes_anteriores, mudou, alteracoes): a posição de cada
+        linha na versão anterior (-1 se inserida), a marca das linhas
+        inseridas ou alteradas e as contagens por turma (ver Alteracao).
+        None se não há versão anterior comparável (outro esquema, outras
+        colunas ou outros tipos).
+    """
+    if (
+        anterior is None
+        or anterior.esquema != esquema
+        or not anterior.data.dtypes.equals(data.dtypes)
+    ):
+        return None
+
+    def chaves(tabela):
+        matriculas = tabela[esquema.matricula].astype('Int64').fillna(-1)
+        ocorrencia = matriculas.groupby(matriculas).cumcount()
+        return pd.MultiIndex.from_arrays([matriculas.to_numpy(), ocorrencia.to_numpy()])
+
+    posicoes_anteriores = chaves(anterior.data).get_indexer(chaves(data))
+    inseridas = posicoes_anteriores < 0
+    mudou = inseridas.copy()
+    pareadas = np.flatnonzero(~inseridas)
+    mudou[pareadas] = anterior.hashes[posicoes_anteriores[pareadas]] != hashes[pareadas]
+    removidas = np.ones(len(anterior.data), dtype=bool)
+    removidas[posicoes_anteriores[~inseridas]] = False
+
+    def por_turma(tabela, marcadas):
+        if not esquema.turma:
+            return pd.Series({None: int(marcadas.sum())})
+        return tabela.loc[marcadas, esquema.turma].value_counts()
+
+    contagens = pd.DataFrame({
+        'inseridas': por_turma(data, inseridas),
+        'alteradas': por_turma(data, mudou & ~inseridas),
+        'removidas': por_turma(anterior.data, removidas),
+    }).fillna(0).astype(int)
+    alteracoes = {
+        turma: Alteracao(*linha)
+        for turma, linha in zip(contagens.index, contagens.itertuples(index=False))
+        if sum(linha)
+    }
+    return posicoes_anteriores, mudou, alteracoes
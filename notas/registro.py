@@ -0,0 +1,142 @@
+"""
+Registro das turmas disponíveis na consulta, lido de um arquivo de configuração.
+
+Cada turma do arquivo (turmas.toml na raiz do projeto, ou o caminho da
+variável NOTAS_TURMAS) informa o rótulo exibido no menu, um código curto
+usado nas URLs da API (opcional, derivado do rótulo), a planilha (pelo
+nome da variável do .env/Secrets com a URL), o filtro da coluna TURMA e,
+opcionalmente, o intervalo de atualização em segundo plano (em segundos) e
+os nomes das colunas quando a detecção automática não serve:
+
+    [[turma]]
+    rotulo = "4º Período A - ML"
+    codigo = "4P_A_ML"
+    variavel_url = "URL_4P_GERAL_ML"
+    filtro_turma = "4P_A"
+    intervalo = 120
+
+    [turma.colunas]
+    matricula = "RA"
+    "AV 01" = "P1"
+
+Turmas que compartilham a mesma planilha são agrupadas em uma única
+FontePlanilha, buscada e processada uma vez só.
+"""
+import os
+import re
+import tomllib
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+
+from notas.esquema import PADRAO_ROTULO, PAPEIS
+
+# Arquivo padrão do registro (pode ser trocado pela variável NOTAS_TURMAS)
+ARQUIVO_PADRAO = Path(__file__).resolve().parent.parent / "turmas.toml"
+
+class RegistroInvalido(ValueError):
+    """Arquivo de turmas com entradas inválidas ou conflitantes."""
+
+@dataclass(frozen=True)
+class Turma:
+    """Opção do menu de turmas: rótulo, planilha e filtro da coluna TURMA."""
+    rotulo: str
+    codigo: str  # Identificador da turma nas URLs da API (ex: '4P_A_ML')
+    url: str  # URL já resolvida ("" se a variável não estiver configurada)
+    filtro_turma: str | None = None
+    colunas: tuple = ()  # Pares (papel, coluna) ordenados (ver resolver_esquema)
+    intervalo: float | None = None  # Segundos entre atualizações (None: padrão do agendador)
+
+@dataclass(frozen=True)
+class FontePlanilha:
+    """Planilha distinta do registro e como processá-la."""
+    url: str
+    turmas: frozenset | None  # Valores de TURMA usados (None: planilha inteira)
+    colunas: tuple = ()
+    intervalo: float | None = None  # Menor intervalo entre as turmas da planilha
+
+def carregar_registro(resolver_url=os.getenv, caminho=None):
+    """
+    Lê o arquivo de turmas.
+
+    Args:
+        resolver_url: Função que recebe o nome da variável e retorna a URL
+            (ou None); o app usa Streamlit Secrets com fallback para o .env
+        caminho: Arquivo TOML (padrão: NOTAS_TURMAS ou turmas.toml)
+
+    Returns:
+        Dicionário {rótulo: Turma}, na ordem do arquivo.
+
+    Raises:
+        RegistroInvalido: se alguma entrada estiver incompleta ou repetida.
+    """
+    caminho = Path(caminho or os.getenv("NOTAS_TURMAS") or ARQUIVO_PADRAO)
+    with open(caminho, "rb") as arquivo:
+        entradas = tomllib.load(arquivo).get("turma", [])
+
+    registro = {}
+    for entrada in entradas:
+        rotulo = entrada.get("rotulo")
+        if not rotulo or "variavel_url" not in entrada:
+            raise RegistroInvalido(f"Turma sem 'rotulo' ou 'variavel_url' em {caminho}: {entrada}")
+        codigo = entrada.get("codigo") or codigo_do_rotulo(rotulo)
+        if rotulo in registro or codigo in {turma.codigo for turma in registro.values()}:
+            raise RegistroInvalido(f"Turma repetida em {caminho}: {rotulo} ({codigo})")
+
+        colunas = entrada.get("colunas", {})
+        invalidos = [p for p in colunas if p not in PAPEIS and not PADRAO_ROTULO.fullmatch(p)]
+        if invalidos:
+            raise RegistroInvalido(f"Papéis de coluna desconhecidos em {rotulo}: {invalidos}")
+
+        registro[rotulo] = Turma(
+            rotulo=rotulo,
+            codigo=codigo,
+            url=resolver_url(entrada["variavel_url"]) or "",
+            filtro_turma=entrada.get("filtro_turma"),
+            colunas=tuple(sorted(colunas.items())),
+            intervalo=entrada.get("intervalo"),
+        )
+    return registro
+
+def codigo_do_rotulo(rotulo):
+    """Código da turma derivado do rótulo: '2º Período C - POO' -> '2O_PERIODO_C_POO'."""
+    sem_acentos = unicodedata.normalize("NFKD", rotulo).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Za-z0-9]+", "_", sem_acentos).strip("_").upper()
+
+def turma_por_codigo(registro, codigo):
+    """Retorna a Turma com o código informado (sem diferenciar maiúsculas), ou None."""
+    codigo = codigo.upper()
+    return next((turma for turma in registro.values() if turma.codigo.upper() == codigo), None)
+
+def planilhas_do_registro(registro):
+    """
+    Agrupa as turmas do registro por planilha.
+
+    Turmas sem URL configurada são ignoradas.
+
+    Returns:
+        Dicionário {url: FontePlanilha}.
+
+    Raises:
+        RegistroInvalido: se turmas da mesma planilha indicarem colunas diferentes.
+    """
+    grupos = {}
+    for turma in registro.values():
+        if turma.url:
+            grupos.setdefault(turma.url, []).append(turma)
+
+    fontes = {}
+    for url, turmas in grupos.items():
+        colunas = {turma.colunas for turma in turmas}
+        if len(colunas) > 1:
+            rotulos = ", ".join(turma.rotulo for turma in turmas)
+            raise RegistroInvalido(f"Turmas da mesma planilha com colunas diferentes: {rotulos}")
+        filtros = {turma.filtro_turma for turma in turmas}
+        intervalos = [turma.intervalo for turma in turmas if turma.intervalo]
+        fontes[url] = FontePlanilha(
+            url=url,
+            turmas=None if None in filtros else frozenset(filtros),
+            colunas=colunas.pop(),
+            intervalo=min(intervalos, default=None),
+        )
+    return fontes
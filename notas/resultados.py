@@ -0,0 +1,79 @@
+"""
+Memória dos resultados já calculados para cada aluno.
+
+Em dia de divulgação, os mesmos alunos consultam as notas várias vezes. Os
+valores lidos da planilha e o HTML do cartão de notas ficam guardados em um
+LRU limitado, por versão do conteúdo da planilha, turma e matrícula. Quando
+o cache publica uma nova versão da planilha (CacheDePlanilhas.assinar), os
+resultados da versão anterior são descartados.
+"""
+import threading
+from collections import OrderedDict
+
+from notas.cache import cache_planilhas
+from notas.metricas import metricas
+
+# Número máximo de resultados guardados no processo
+CAPACIDADE_RESULTADOS = 4096
+
+class MemoDeResultados:
+    """
+    LRU de resultados por (planilha, versão do conteúdo, chave).
+
+    Args:
+        cache: CacheDePlanilhas cujas novas versões descartam os resultados
+        capacidade: Número máximo de resultados guardados
+    """
+
+    def __init__(self, cache, capacidade=CAPACIDADE_RESULTADOS):
+        self.capacidade = capacidade
+        self._itens = OrderedDict()  # (url, versão, *chave) -> valor
+        self._por_url = {}  # URL -> chaves guardadas da planilha
+        self._lock = threading.Lock()
+        cache.assinar(self._nova_versao)
+
+    def obter(self, url, versao, chave, calcular):
+        """
+        Retorna o resultado guardado, calculando-o na primeira vez.
+
+        Args:
+            url: URL da planilha de onde o resultado vem
+            versao: Versão do conteúdo da planilha (ver DadosTurma.versao)
+            chave: Tupla que identifica o resultado na versão (ex: turma, matrícula)
+            calcular: Função sem argumentos que produz o resultado
+        """
+        completa = (url, versao, *chave)
+        with self._lock:
+            acerto = completa in self._itens
+            if acerto:
+                self._itens.move_to_end(completa)
+                valor = self._itens[completa]
+        metricas.contar(
+            "notas_resultados_total", planilha=metricas.planilha(url), resultado="acerto" if acerto else "falta"
+        )
+        if acerto:
+            return valor
+
+        valor = calcular()  # Fora do lock: cálculos de alunos diferentes não se esperam
+        with self._lock:
+            self._itens[completa] = valor
+            self._por_url.setdefault(url, set()).add(completa)
+            while len(self._itens) > self.capacidade:
+                antiga, _ = self._itens.popitem(last=False)
+                self._por_url[antiga[0]].discard(antiga)
+        return valor
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _nova_versao(self, url, entrada):
+        """Descarta os resultados de versões anteriores da planilha da URL."""
+        with self._lock:
+            chaves = self._por_url.get(url, set())
+            antigas = {chave for chave in chaves if chave[1] != entrada.hash_conteudo}
+            for chave in antigas:
+                del self._itens[chave]
+            chaves -= antigas
+
+# Memória única do processo, sobre o cache compartilhado
+memo_resultados = MemoDeResultados(cache_planilhas)
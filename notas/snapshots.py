@@ -0,0 +1,142 @@
+"""
+Snapshots em disco das planilhas processadas.
+
+Cada planilha baixada com sucesso é gravada em um arquivo Arrow IPC sem
+compressão (mapeável em memória), com o horário da busca, o hash do CSV e os
+validadores HTTP nos metadados do próprio arquivo. Depois de um redeploy ou
+reinício, o cache parte desses arquivos em milissegundos, sem baixar nem
+reprocessar o CSV, e revalida a planilha em segundo plano.
+
+Com vários processos do app na mesma máquina (NOTAS_COMPARTILHADO=1), o
+diretório de snapshots também é o armazenamento compartilhado entre eles: só
+o processo que obtém o lock do diretório (o líder) busca as planilhas no
+servidor e grava os snapshots, e os demais leem os snapshots gravados por
+ele. Se o líder parar, o próximo processo que tentar obtém o lock e assume.
+
+O compartilhamento evita os downloads repetidos, não a memória: cada
+processo converte o snapshot em DataFrame (uma cópia própria dos dados) e
+calcula as próprias notas e índices.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem compartilhamento entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Diretório padrão dos snapshots (pode ser trocado pela variável NOTAS_SNAPSHOTS)
+DIRETORIO_PADRAO = Path(__file__).resolve().parent.parent / ".cache" / "planilhas"
+# Chave dos metadados do sistema no esquema Arrow
+CHAVE_METADADOS = b"notas"
+# Arquivo de lock que elege o processo que busca as planilhas
+ARQUIVO_LIDER = ".lider.lock"
+
+class Snapshots:
+    """
+    Diretório de snapshots, um arquivo por URL.
+
+    O nome do arquivo é derivado do hash da URL, que não fica gravada em
+    disco.
+    """
+
+    def __init__(self, diretorio=None, compartilhado=None):
+        self._diretorio = diretorio
+        self._compartilhado = compartilhado
+        self._lock_lider = None  # Arquivo de lock aberto enquanto este processo lidera
+        self._lock = threading.Lock()
+
+    @property
+    def diretorio(self):
+        # Resolvido no uso, depois que o .env já foi carregado
+        return Path(self._diretorio or os.getenv("NOTAS_SNAPSHOTS") or DIRETORIO_PADRAO)
+
+    @property
+    def compartilhado(self):
+        """Indica se o diretório é compartilhado com outros processos (NOTAS_COMPARTILHADO)."""
+        if self._compartilhado is not None:
+            return self._compartilhado
+        return fcntl is not None and os.getenv("NOTAS_COMPARTILHADO", "").lower() in ("1", "true", "sim")
+
+    def liderar(self):
+        """
+        Tenta fazer deste processo o líder, que busca as planilhas no servidor.
+
+        Não bloqueia: o lock fica com o primeiro processo que o pedir, até
+        ele terminar. Sem compartilhamento, o processo é sempre o líder.
+
+        Returns:
+            True se este processo é o líder.
+        """
+        if not self.compartilhado:
+            return True
+        with self._lock:
+            if self._lock_lider is None:
+                self.diretorio.mkdir(parents=True, exist_ok=True)
+                arquivo = open(self.diretorio / ARQUIVO_LIDER, "a")
+                try:
+                    fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    arquivo.close()
+                    return False
+                self._lock_lider = arquivo
+                logger.info("Este processo passou a buscar as planilhas (líder)")
+            return True
+
+    def salvar(self, url, data, **metadados):
+        """
+        Grava os dados da planilha e os metadados informados.
+
+        A escrita vai para um arquivo temporário que depois substitui o
+        anterior, para que uma leitura concorrente nunca veja um snapshot
+        pela metade.
+        """
+        tabela = pa.Table.from_pandas(data, preserve_index=False)
+        tabela = tabela.replace_schema_metadata({
+            **(tabela.schema.metadata or {}),
+            CHAVE_METADADOS: json.dumps(metadados).encode(),
+        })
+
+        caminho = self._caminho(url)
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        with pa.OSFile(str(temporario), "wb") as arquivo:
+            with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, caminho)
+
+    def carregar(self, url):
+        """
+        Lê o snapshot da URL.
+
+        Returns:
+            Tupla (data, metadados), ou None se não houver snapshot.
+        """
+        caminho = self._caminho(url)
+        if not caminho.exists():
+            return None
+
+        with pa.memory_map(str(caminho)) as arquivo:
+            tabela = pa.ipc.open_file(arquivo).read_all()
+            metadados = json.loads(tabela.schema.metadata[CHAVE_METADADOS])
+            return tabela.to_pandas(), metadados
+
+    def metadados(self, url):
+        """Lê só os metadados do snapshot da URL (ou None), sem carregar os dados."""
+        caminho = self._caminho(url)
+        if not caminho.exists():
+            return None
+
+        with pa.memory_map(str(caminho)) as arquivo:
+            return json.loads(pa.ipc.open_file(arquivo).schema.metadata[CHAVE_METADADOS])
+
+    def _caminho(self, url):
+        return self.diretorio / f"{hashlib.sha256(url.encode()).hexdigest()[:32]}.arrow"
@@ -0,0 +1,112 @@
+"""
+Cenários compartilhados pelos testes: planilhas sintéticas, o servidor local
+de benchmarks.servidor no lugar do Google Sheets, o app pelo AppTest e a API.
+"""
+import http.client
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from benchmarks.carga import TURMAS_DO_TESTE
+from benchmarks.planilhas import TURMAS, gerar_planilha
+from benchmarks.servidor import ServidorDePlanilhas
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+# Alunos em cada planilha sintética
+LINHAS = 500
+# Código de acesso da coordenação e do diagnóstico usado nos testes
+TOKEN = "token-dos-testes"
+
+@pytest.fixture(scope="session", autouse=True)
+def snapshots_temporarios(tmp_path_factory):
+    """Snapshots em um diretório temporário, para não misturar com os do app."""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("NOTAS_SNAPSHOTS", str(tmp_path_factory.mktemp("snapshots")))
+        yield
+
+@pytest.fixture
+def servidor():
+    """Servidor de planilhas próprio do teste."""
+    with ServidorDePlanilhas() as servidor:
+        yield servidor
+
+@pytest.fixture(scope="session")
+def planilhas_do_app():
+    """
+    Publica as planilhas de TURMAS_DO_TESTE e aponta o app.py para elas, com
+    os códigos de acesso da coordenação e do diagnóstico iguais a TOKEN.
+
+    O app lê a configuração uma vez por processo (notas.configuracao): o
+    servidor é o mesmo em toda a sessão de testes.
+
+    Yields:
+        Tupla (servidor, {layout: CSV publicado}).
+    """
+    with ServidorDePlanilhas() as servidor, pytest.MonkeyPatch.context() as patch:
+        publicadas = {}
+        for variavel, layout, _ in TURMAS_DO_TESTE.values():
+            publicadas.setdefault(layout, gerar_planilha(LINHAS, layout, turmas=TURMAS))
+            patch.setenv(variavel, servidor.publicar(f"{layout}.csv", publicadas[layout]))
+        patch.setenv("TOKEN_COORDENACAO", TOKEN)
+        patch.setenv("TOKEN_ADMIN", TOKEN)
+        yield servidor, publicadas
+
+@pytest.fixture
+def abrir_app(planilhas_do_app):
+    """Função que executa o app.py uma vez pelo AppTest, com os parâmetros de URL informados."""
+    from streamlit.testing.v1 import AppTest
+
+    def abrir(**parametros):
+        app = AppTest.from_file(str(APP), default_timeout=60)
+        for chave, valor in parametros.items():
+            app.query_params[chave] = valor
+        return app.run()
+
+    return abrir
+
+@pytest.fixture
+def api(servidor):
+    """
+    Função que sobe a API (notas.api) em uma thread, com as turmas informadas
+    publicadas no servidor de planilhas e um cache próprio.
+
+    A função recebe os rótulos das turmas (padrão: "4º Período B - ML") e,
+    opcionalmente, o CSV a publicar no lugar da planilha sintética de cada
+    layout ({layout: CSV}); retorna (requisitar, código da primeira turma, endereço);
+    requisitar(método, caminho, corpo=None, cabecalhos=None) retorna
+    (status, corpo em bytes).
+    """
+    from notas.api import criar_servidor
+    from notas.cache import CacheDePlanilhas
+    from notas.registro import Turma, codigo_do_rotulo
+
+    servidores = []
+
+    def subir(rotulos=("4º Período B - ML",), conteudos=None):
+        registro = {}
+        for rotulo in rotulos:
+            _, layout, filtro = TURMAS_DO_TESTE[rotulo]
+            conteudo = (conteudos or {}).get(layout) or gerar_planilha(LINHAS, layout, turmas=TURMAS)
+            url = servidor.publicar(f"{layout}.csv", conteudo)
+            registro[rotulo] = Turma(rotulo, codigo_do_rotulo(rotulo), url, filtro)
+        api = criar_servidor(registro, ("127.0.0.1", 0), cache=CacheDePlanilhas(), token=TOKEN)
+        threading.Thread(target=api.serve_forever, daemon=True).start()
+        servidores.append(api)
+
+        def requisitar(metodo, caminho, corpo=None, cabecalhos=None):
+            conexao = http.client.HTTPConnection(*api.server_address[:2], timeout=30)
+            try:
+                conexao.request(metodo, caminho, corpo, {"Authorization": f"Bearer {TOKEN}", **(cabecalhos or {})})
+                resposta = conexao.getresponse()
+                return resposta.status, resposta.read()
+            finally:
+                conexao.close()
+
+        return requisitar, registro[rotulos[0]].codigo, api.server_address[:2]
+
+    yield subir
+    for api in servidores:
+        api.shutdown()
+        api.server_close()
@@ -0,0 +1,108 @@
+"""API HTTP (notas.api) contra o servidor de planilhas local."""
+import csv
+import io
+import json
+import socket
+
+import pandas as pd
+
+from benchmarks.planilhas import TURMAS, gerar_planilha, matriculas_da_planilha
+from tests.conftest import LINHAS, TOKEN
+
+def test_matriculas_fora_do_intervalo(api):
+    """Matrículas que não cabem em int64 são descartadas, sem derrubar a exportação."""
+    from notas.exportacao import ler_matriculas
+
+    assert ler_matriculas("1\n123456789012345678901234567890\n2") == [1, 2]
+    requisitar, codigo, _ = api()
+    # Pela API, a resposta sai completa (sem CSV truncado depois do status 200)
+    status, corpo = requisitar("POST", f"/exportacao/{codigo}", b"1\n123456789012345678901234567890\n")
+    assert status == 200, (status, corpo)
+    linhas = corpo.decode("utf-8-sig").splitlines()
+    assert len(linhas) == 2 and linhas[1].startswith("1;"), linhas
+
+def test_envio_da_exportacao(api):
+    """O corpo do POST só é lido depois do token, e com Content-Length válido e limitado."""
+    from notas.api import TAMANHO_MAXIMO_ENVIO
+
+    requisitar, codigo, endereco = api()
+
+    def status(cabecalhos):
+        # Só o cabeçalho é enviado: a API não pode ficar esperando o corpo anunciado
+        with socket.create_connection(endereco, timeout=5) as conexao:
+            conexao.sendall(f"POST /exportacao/{codigo} HTTP/1.1\r\nHost: api\r\n{cabecalhos}\r\n".encode())
+            return int(conexao.recv(1024).split()[1])
+
+    autorizado = f"Authorization: Bearer {TOKEN}\r\n"
+    assert status(f"Content-Length: {10**12}\r\n") == 401
+    assert status(autorizado + f"Content-Length: {TAMANHO_MAXIMO_ENVIO + 1}\r\n") == 413
+    assert status(autorizado + "Content-Length: -1\r\n") == 400
+    assert status(autorizado + "Content-Length: muitos\r\n") == 400
+    assert status(autorizado) == 400
+    assert requisitar("POST", "/turmas", b"1")[0] == 405
+    assert requisitar("POST", f"/exportacao/{codigo}", b"1\n")[0] == 200
+
+def test_notas_sem_turma(api):
+    """GET /notas/{matricula} responde com as notas do aluno em todas as turmas em que aparece."""
+    requisitar, _, _ = api(("4º Período A - ML", "4º Período B - ML", "2º Período C - POO"))
+    matricula = matriculas_da_planilha(gerar_planilha(LINHAS, "consolidada", turmas=TURMAS), "4P_B")[0]
+    status, corpo = requisitar("GET", f"/notas/{matricula}")
+    assert status == 200, (status, corpo)
+    # As planilhas sintéticas usam as mesmas matrículas: o aluno da 4P_B também está na POO
+    assert sorted(nota["turma"] for nota in json.loads(corpo)) == ["2º Período C - POO", "4º Período B - ML"], corpo
+    assert requisitar("GET", "/notas/1")[0] == 404
+    assert requisitar("GET", "/notas/abc")[0] == 400
+
+def test_exportacao_do_curso_com_avaliacoes_diferentes(api):
+    """Turmas com avaliações diferentes saem com as colunas de todas, alinhadas com o cabeçalho."""
+    # A planilha da ML ganha AV 03 e AF; a da POO continua só com AV 01 e AV 02
+    consolidada = pd.read_csv(io.BytesIO(gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)), dtype=str, keep_default_na=False)
+    consolidada.insert(consolidada.columns.get_loc("MÉDIA"), "AV 03", "8")
+    consolidada.insert(consolidada.columns.get_loc("MÉDIA"), "AF", "")
+    requisitar, _, _ = api(
+        ("2º Período C - POO", "4º Período A - ML"), {"consolidada": consolidada.to_csv(index=False).encode()}
+    )
+
+    status, corpo = requisitar("GET", "/exportacao")
+    assert status == 200, (status, corpo)
+    cabecalho, *linhas = csv.reader(io.StringIO(corpo.decode("utf-8-sig")), delimiter=";")
+    assert cabecalho == [
+        "Turma", "Matrícula", "Nome", "AV 01", "AV 01 faltou", "AV 02", "AV 02 faltou",
+        "AV 03", "AV 03 faltou", "AF", "AF faltou", "MÉDIA", "Situação",
+    ]
+    assert {len(linha) for linha in linhas} == {len(cabecalho)}
+    por_turma = {turma: [dict(zip(cabecalho, linha)) for linha in linhas if linha[0] == turma]
+                 for turma in ("2º Período C - POO", "4º Período A - ML")}
+    assert all(linha["AV 03"] == "" and linha["MÉDIA"] for linha in por_turma["2º Período C - POO"])
+    assert all(linha["AV 03"] == "8.0" and linha["AF"] == "" for linha in por_turma["4º Período A - ML"])
+
+def test_colunas_da_exportacao_mantem_a_ordem_das_avaliacoes():
+    from notas.esquema import Esquema
+    from notas.exportacao import colunas_da_exportacao
+
+    def esquema(*rotulos):
+        return Esquema("MATRÍCULA", "NOME", tuple((rotulo, rotulo) for rotulo in rotulos))
+
+    colunas = colunas_da_exportacao([esquema("AV 01", "AF"), esquema("AV 01", "AV 02", "AV 03", "AF")])
+    assert [coluna for coluna in colunas if not coluna.endswith("faltou")] == [
+        "Matrícula", "Nome", "AV 01", "AV 02", "AV 03", "AF", "MÉDIA", "Situação",
+    ]
+
+def test_notas_sem_turma_so_carrega_planilhas_fora_do_cache(api, monkeypatch):
+    """Com as planilhas em cache, GET /notas/{matricula} não passa pelo pool de carga."""
+    from notas.cache import CacheDePlanilhas
+
+    pedidas = []
+    carregar = CacheDePlanilhas.carregar
+
+    def registrar(self, fontes, *args, **kwargs):
+        fontes = list(fontes)
+        pedidas.append(len(fontes))
+        return carregar(self, fontes, *args, **kwargs)
+
+    monkeypatch.setattr(CacheDePlanilhas, "carregar", registrar)
+    requisitar, _, _ = api(("4º Período A - ML", "2º Período C - POO"))
+    matricula = matriculas_da_planilha(gerar_planilha(LINHAS, "consolidada", turmas=TURMAS), "4P_A")[0]
+    for _ in range(3):
+        assert requisitar("GET", f"/notas/{matricula}")[0] == 200
+    assert pedidas == [2, 0, 0], pedidas
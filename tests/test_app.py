@@ -0,0 +1,87 @@
+"""Páginas do app.py pelo AppTest: consulta, área da coordenação e diagnóstico."""
+import os
+
+from benchmarks.carga import TURMAS_DO_TESTE
+from benchmarks.planilhas import alterar_notas, matriculas_da_planilha
+from tests.conftest import TOKEN
+
+def test_exportacao_gera_arquivo_no_clique(abrir_app, monkeypatch):
+    """O download da área da coordenação gera o arquivo quando o botão é clicado."""
+    from streamlit.runtime.media_file_manager import MediaFileManager
+
+    from notas.exportacao import XLSX_DISPONIVEL
+
+    # O AppTest descarta o Runtime ao fim de cada execução: guardar o gerenciador
+    # de arquivos em que cada chamável foi registrado, para executá-lo como no clique
+    gerenciadores = {}
+    registrar = MediaFileManager.add_deferred
+
+    def add_deferred(self, *args, **kwargs):
+        identificador = registrar(self, *args, **kwargs)
+        gerenciadores[identificador] = self
+        return identificador
+
+    monkeypatch.setattr(MediaFileManager, "add_deferred", add_deferred)
+    app = abrir_app()
+    app.sidebar.text_input[0].input(TOKEN).run()
+    app.sidebar.selectbox[0].select("4º Período B - ML").run()
+    for formato, inicio in (("CSV", "\ufeffMatrícula;".encode()), ("XLSX", b"PK")):
+        if formato == "XLSX" and not XLSX_DISPONIVEL:
+            continue
+        app.sidebar.radio[1].set_value(formato).run()
+        assert not app.exception, app.exception
+        identificador = app.get("download_button")[0].proto.deferred_file_id
+        gerenciador = gerenciadores[identificador]
+        url = gerenciador.execute_deferred(identificador)
+        arquivo = gerenciador._storage.get_file(url.rsplit("/", 1)[-1].split(".")[0])
+        assert arquivo.content.startswith(inicio), arquivo.content[:40]
+
+def test_alteracoes_no_diagnostico(abrir_app, planilhas_do_app):
+    """Notas alteradas em uma atualização da planilha aparecem na página de diagnóstico."""
+    from notas.cache import cache_planilhas
+
+    servidor, publicadas = planilhas_do_app
+    variavel, layout, filtro = TURMAS_DO_TESTE["4º Período B - ML"]
+    abrir_app().selectbox[0].select("4º Período B - ML").run()
+    servidor.publicar(f"{layout}.csv", alterar_notas(publicadas[layout], fracao=0.1))
+    try:
+        cache_planilhas.revalidar(os.environ[variavel])
+    finally:
+        servidor.publicar(f"{layout}.csv", publicadas[layout])
+
+    app = abrir_app(diagnostico="")
+    app.text_input[0].input(TOKEN).run()
+    assert not app.exception, app.exception
+    assert any(f"alteradas em {filtro}" in elemento.value for elemento in app.markdown), "Alteração não exibida"
+
+def test_memoria_no_diagnostico(abrir_app):
+    """A página de diagnóstico mostra a memória de cada planilha em cache."""
+    abrir_app().selectbox[0].select("2º Período C - POO").run()
+    app = abrir_app(diagnostico="")
+    app.text_input[0].input(TOKEN).run()
+    assert not app.exception, app.exception
+    planilhas = next(tabela.value for tabela in app.dataframe if "memória (KiB)" in tabela.value)
+    assert len(planilhas) and (planilhas["memória (KiB)"] > 0).all(), planilhas
+
+def test_resumo_no_diagnostico(abrir_app):
+    """A página de diagnóstico resume as notas de cada turma em cache."""
+    abrir_app().selectbox[0].select("4º Período A - ML").run()
+    app = abrir_app(diagnostico="")
+    app.text_input[0].input(TOKEN).run()
+    assert not app.exception, app.exception
+    resumos = next(tabela.value for tabela in app.dataframe if "aprovação" in tabela.value)
+    turma = resumos[resumos["turma"] == "4º Período A - ML"].iloc[0]
+    assert 0 < turma["aprovados"] + turma["prova final"] <= turma["alunos"], resumos
+
+def test_matricula_em_outra_turma(abrir_app, planilhas_do_app):
+    """A matrícula de outra turma mostra as notas de lá, sem nova consulta."""
+    _, publicadas = planilhas_do_app
+    matricula = matriculas_da_planilha(publicadas["consolidada"], "4P_A")[0]
+    app = abrir_app()
+    app.selectbox[0].select("4º Período B - ML").run()
+    app.text_input[0].input(str(matricula))
+    next(botao for botao in app.button if "Consultar" in botao.label).click().run()
+    assert not app.exception and not app.error, (app.exception, app.error)
+    assert any("4º Período A - ML" in elemento.value for elemento in app.warning), "Turma da matrícula não indicada"
+    assert any(elemento.value == "Aluno encontrado!" for elemento in app.success), "Aluno não exibido"
+    assert any(elemento.value == "## 🎓 4º Período A - ML" for elemento in app.markdown), "Notas da outra turma não exibidas"
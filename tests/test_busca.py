@@ -0,0 +1,121 @@
+"""Download das planilhas (notas.busca) com falhas injetadas pelo servidor local."""
+import functools
+import http.client
+import time
+import urllib.error
+
+import pytest
+
+from benchmarks.planilhas import TURMAS, alterar_notas, gerar_planilha
+from benchmarks.servidor import ServidorDePlanilhas
+from notas.busca import CircuitoAberto, Disjuntor, baixar, erro_transitorio
+from notas.cache import CacheDePlanilhas
+from notas.planilha import processar_planilha
+from tests.conftest import LINHAS
+
+@pytest.fixture(scope="module")
+def conteudo():
+    return gerar_planilha(LINHAS, "simples", turmas=TURMAS)
+
+def test_retentativas(servidor, conteudo):
+    """Erros 5xx são repetidos até o limite de tentativas, uma requisição por tentativa."""
+    url = servidor.publicar("simples.csv", conteudo)
+
+    servidor.falhar("simples.csv", vezes=2)
+    assert baixar(url, tentativas=3, espera_base=0).conteudo == conteudo
+    assert servidor.requisicoes == 3 and servidor.respostas == {503: 2, 200: 1}, servidor.respostas
+
+    servidor.falhar("simples.csv", vezes=3, status=502)
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        baixar(url, tentativas=3, espera_base=0)
+    assert erro.value.code == 502
+    assert servidor.requisicoes == 6
+
+    # Erros do cliente não são repetidos
+    servidor.falhar("simples.csv", vezes=3, status=404)
+    with pytest.raises(urllib.error.HTTPError) as erro:
+        baixar(url, tentativas=3, espera_base=0)
+    assert erro.value.code == 404
+    assert servidor.requisicoes == 7
+
+def test_corpo_truncado(servidor, conteudo):
+    """Corpo menor que o Content-Length levanta IncompleteRead, e é repetido como erro transitório."""
+    url = servidor.publicar("simples.csv", conteudo)
+
+    servidor.falhar("simples.csv", status=None, truncar=True)
+    with pytest.raises(http.client.IncompleteRead) as erro:
+        baixar(url, tentativas=1)
+    assert len(erro.value.partial) == len(conteudo) // 2
+
+    servidor.falhar("simples.csv", status=None, truncar=True)
+    assert baixar(url, tentativas=2, espera_base=0).conteudo == conteudo
+    assert servidor.requisicoes == 3
+
+def test_timeout(servidor, conteudo):
+    """Servidor que demora a responder estoura timeout_conexao, sem esperar a resposta."""
+    url = servidor.publicar("simples.csv", conteudo)
+    servidor.falhar("simples.csv", status=None, atraso=2.0)
+    inicio = time.monotonic()
+    with pytest.raises(Exception) as erro:
+        baixar(url, timeout_conexao=0.2, tentativas=1)
+    assert erro_transitorio(erro.value) and "timed out" in str(erro.value), repr(erro.value)
+    assert time.monotonic() - inicio < 1.0
+
+def test_disjuntor(servidor, conteudo):
+    """Falhas seguidas abrem o circuito; passado tempo_aberto, uma busca de teste o fecha ou reabre."""
+    url = servidor.publicar("simples.csv", conteudo)
+    cache = CacheDePlanilhas(baixar=functools.partial(baixar, tentativas=1, espera_base=0))
+    cache._disjuntores[url] = Disjuntor(falhas_para_abrir=3, tempo_aberto=0.2)
+
+    servidor.falhar("simples.csv", vezes=4)
+    for _ in range(3):
+        with pytest.raises(urllib.error.HTTPError):
+            cache.revalidar(url)
+    assert cache.circuito_aberto(url)
+    with pytest.raises(CircuitoAberto):
+        cache.revalidar(url)
+    assert servidor.requisicoes == 3
+
+    # Meio aberto: a busca de teste falha e o circuito reabre na hora
+    time.sleep(0.25)
+    with pytest.raises(urllib.error.HTTPError):
+        cache.revalidar(url)
+    with pytest.raises(CircuitoAberto):
+        cache.revalidar(url)
+    assert servidor.requisicoes == 4
+
+    # Meio aberto de novo: a busca de teste dá certo e o circuito fecha
+    time.sleep(0.25)
+    assert cache.revalidar(url).planilha is not None
+    assert not cache.circuito_aberto(url)
+    assert servidor.requisicoes == 5
+
+@pytest.mark.parametrize("etag, last_modified", [(True, False), (False, True), (False, False)])
+def test_validadores(conteudo, etag, last_modified):
+    """Com ETag, Last-Modified ou nenhum validador, a planilha só é reprocessada quando o conteúdo muda."""
+    processadas = []
+
+    def processar(conteudo, *args):
+        processadas.append(conteudo)
+        return processar_planilha(conteudo, *args)
+
+    alterado = alterar_notas(conteudo, fracao=0.1)
+    with ServidorDePlanilhas() as servidor:
+        url = servidor.publicar("simples.csv", conteudo, etag=etag, last_modified=last_modified)
+        cache = CacheDePlanilhas(processar=processar)
+
+        entrada = cache.revalidar(url)
+        assert (entrada.etag is not None, entrada.last_modified is not None) == (etag, last_modified)
+
+        # Mesma versão: 304 com validadores; sem eles, o hash evita reprocessar o mesmo conteúdo
+        mesma = cache.revalidar(url)
+        if etag or last_modified:
+            assert servidor.respostas == {200: 1, 304: 1}, servidor.respostas
+        else:
+            assert servidor.respostas == {200: 2}, servidor.respostas
+        assert mesma.planilha is entrada.planilha and processadas == [conteudo]
+
+        # Nova versão: processada de novo
+        servidor.publicar("simples.csv", alterado, etag=etag, last_modified=last_modified)
+        nova = cache.revalidar(url)
+        assert nova.planilha is not entrada.planilha and processadas == [conteudo, alterado]
@@ -0,0 +1,95 @@
+"""Cache das planilhas (notas.cache): atualização forçada e snapshots em disco."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from benchmarks.planilhas import TURMAS, alterar_notas, gerar_planilha
+from notas.cache import CacheDePlanilhas
+from notas.snapshots import Snapshots
+from tests.conftest import LINHAS
+
+def test_atualizar_respeita_intervalo_minimo(servidor):
+    """Atualizações seguidas da mesma planilha dentro do intervalo mínimo não vão ao servidor."""
+    url = servidor.publicar("consolidada.csv", gerar_planilha(LINHAS, "consolidada", turmas=TURMAS))
+    cache = CacheDePlanilhas(intervalo_minimo=60)
+
+    entrada, buscou = cache.atualizar(url)
+    assert buscou and servidor.requisicoes == 1
+    assert cache.atualizar(url) == (entrada, False)
+    assert servidor.requisicoes == 1
+
+    # Sem intervalo mínimo, cada pedido busca de novo (e o 304 mantém a planilha)
+    cache.intervalo_minimo = 0
+    nova, buscou = cache.atualizar(url)
+    assert buscou and servidor.requisicoes == 2 and nova.planilha is entrada.planilha
+
+def test_atualizar_compartilha_a_busca_em_andamento(servidor):
+    """Pedidos simultâneos para a mesma planilha compartilham uma única busca."""
+    url = servidor.publicar("consolidada.csv", gerar_planilha(LINHAS, "consolidada", turmas=TURMAS))
+    cache = CacheDePlanilhas(intervalo_minimo=60)
+    servidor.latencia = 0.3
+
+    with ThreadPoolExecutor(8) as pool:
+        resultados = list(pool.map(lambda _: cache.atualizar(url), range(8)))
+    assert servidor.requisicoes == 1
+    assert all(entrada is resultados[0][0] and buscou for entrada, buscou in resultados)
+
+def test_snapshot_restaura_a_planilha(servidor, tmp_path):
+    """Um cache novo parte do snapshot gravado, igual à planilha processada, e revalida em segundo plano."""
+    conteudo = gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)
+    url = servidor.publicar("consolidada.csv", conteudo)
+    turmas = ("4P_A", "4P_B")
+
+    gravada = CacheDePlanilhas(snapshots=Snapshots(tmp_path, compartilhado=False)).obter_entrada(url, turmas)
+    assert servidor.requisicoes == 1
+
+    # Servidor fora do ar: a primeira carga sai só do snapshot
+    servidor.falhar("consolidada.csv", vezes=10)
+    restaurada = CacheDePlanilhas(snapshots=Snapshots(tmp_path, compartilhado=False)).obter_entrada(url, turmas)
+    pd.testing.assert_frame_equal(restaurada.planilha.data, gravada.planilha.data)
+    pd.testing.assert_frame_equal(restaurada.planilha.notas, gravada.planilha.notas)
+    assert restaurada.planilha.indices == gravada.planilha.indices
+    assert restaurada.planilha.particoes == gravada.planilha.particoes
+    assert (restaurada.etag, restaurada.hash_conteudo, restaurada.buscada_em, restaurada.turmas) == (
+        gravada.etag, gravada.hash_conteudo, gravada.buscada_em, gravada.turmas,
+    )
+
+def test_snapshot_de_outras_turmas_ignorado(servidor, tmp_path):
+    """O snapshot gravado com outras turmas não é usado: a planilha é buscada no servidor."""
+    url = servidor.publicar("consolidada.csv", gerar_planilha(LINHAS, "consolidada", turmas=TURMAS))
+    CacheDePlanilhas(snapshots=Snapshots(tmp_path, compartilhado=False)).obter_entrada(url, ("4P_A",))
+
+    entrada = CacheDePlanilhas(snapshots=Snapshots(tmp_path, compartilhado=False)).obter_entrada(url, ("4P_B",))
+    assert servidor.requisicoes == 2 and set(entrada.planilha.particoes) == {"4P_B"}
+
+def test_nova_versao_atualiza_o_snapshot(servidor, tmp_path):
+    """Cada nova versão baixada substitui o snapshot da planilha."""
+    conteudo = gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)
+    url = servidor.publicar("consolidada.csv", conteudo)
+    snapshots = Snapshots(tmp_path, compartilhado=False)
+    cache = CacheDePlanilhas(snapshots=snapshots)
+    cache.obter_entrada(url)
+
+    servidor.publicar("consolidada.csv", alterar_notas(conteudo, fracao=0.1))
+    nova = cache.revalidar(url)
+    assert snapshots.metadados(url)["hash_conteudo"] == nova.hash_conteudo
+
+def test_so_o_lider_grava_snapshots(servidor, tmp_path):
+    """Sem snapshot do líder, o seguidor busca no servidor mas não grava no diretório compartilhado."""
+    conteudo = gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)
+    url = servidor.publicar("consolidada.csv", conteudo)
+    lider = Snapshots(tmp_path, compartilhado=True)
+    assert lider.liderar()
+    try:
+        seguidor = CacheDePlanilhas(snapshots=Snapshots(tmp_path, compartilhado=True))
+        entrada = seguidor.obter_entrada(url)
+        assert servidor.requisicoes == 1 and entrada.planilha is not None
+        assert lider.metadados(url) is None
+
+        # Depois que o líder grava, o seguidor relê o snapshot em vez de ir ao servidor
+        CacheDePlanilhas(snapshots=lider).obter_entrada(url)
+        servidor.publicar("consolidada.csv", alterar_notas(conteudo, fracao=0.1))
+        assert seguidor.revalidar(url).hash_conteudo == entrada.hash_conteudo
+        assert servidor.requisicoes == 2
+    finally:
+        lider._lock_lider.close()
@@ -0,0 +1,63 @@
+"""Exportador de métricas para o Prometheus (notas.metricas) e seu endereço na configuração."""
+import socket
+import urllib.request
+
+import pytest
+
+from notas import configuracao
+from notas.configuracao import ler_endereco
+from notas.metricas import Metricas, metricas
+
+@pytest.fixture
+def porta_ocupada():
+    """Porta já em uso por outro socket, como a de outra réplica do app."""
+    with socket.socket() as ocupante:
+        ocupante.bind(("127.0.0.1", 0))
+        ocupante.listen()
+        yield ocupante.getsockname()[1]
+
+@pytest.mark.parametrize("texto, endereco", [
+    ("9108", ("127.0.0.1", 9108)),
+    ("0.0.0.0:9108", ("0.0.0.0", 9108)),
+    (9108, ("127.0.0.1", 9108)),
+    ("", None),
+])
+def test_ler_endereco(texto, endereco):
+    assert ler_endereco(texto) == endereco
+
+@pytest.mark.parametrize("texto", ["metricas", "host:", "70000", "-1"])
+def test_ler_endereco_invalido(texto):
+    with pytest.raises(ValueError):
+        ler_endereco(texto)
+
+def test_servir_responde_metrics():
+    registro = Metricas()
+    registro.contar("notas_buscas_total", resultado="falha")
+    assert registro.servir(("127.0.0.1", 0))
+    host, porta = registro._servidor.server_address[:2]
+    with urllib.request.urlopen(f"http://{host}:{porta}/metrics", timeout=5) as resposta:
+        assert b'notas_buscas_total{resultado="falha"} 1' in resposta.read()
+    assert registro.servir(("127.0.0.1", 0))  # Chamadas seguintes reaproveitam o servidor
+    registro._servidor.shutdown()
+
+def test_servir_com_porta_ocupada_nao_tenta_de_novo(porta_ocupada, caplog):
+    registro = Metricas()
+    assert not registro.servir(("127.0.0.1", porta_ocupada))
+    assert not registro.servir(("127.0.0.1", 0))
+    assert sum("Métricas do Prometheus desativadas" in r.message for r in caplog.records) == 1
+
+@pytest.mark.parametrize("valor", ["ocupada", "metricas"])
+def test_app_sem_o_exportador(abrir_app, monkeypatch, porta_ocupada, valor):
+    """Com a porta das métricas ocupada ou inválida, a página segue funcionando, em todas as execuções."""
+    monkeypatch.setenv("NOTAS_METRICAS", str(porta_ocupada) if valor == "ocupada" else valor)
+    monkeypatch.setattr(configuracao, "_configuracao", None)
+    monkeypatch.setattr(metricas, "_servidor", None)
+    monkeypatch.setattr(metricas, "_falha_servidor", None)
+
+    app = abrir_app()
+    for _ in range(2):
+        assert not app.exception, app.exception
+        assert app.selectbox[0].label
+        app.selectbox[0].select("4º Período B - ML").run()
+    assert metricas._servidor is None
+    assert (metricas._falha_servidor is not None) == (valor == "ocupada")
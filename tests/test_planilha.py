@@ -0,0 +1,104 @@
+"""Processamento das planilhas (notas.planilha): leitura em blocos e atualização incremental."""
+import io
+
+import pandas as pd
+import pytest
+
+from benchmarks.planilhas import TURMAS, alterar_notas, gerar_planilha
+from notas import planilha as modulo_planilha
+from notas.planilha import processar_planilha
+from tests.conftest import LINHAS
+
+def _tabela(conteudo):
+    return pd.read_csv(io.BytesIO(conteudo), dtype=str, keep_default_na=False)
+
+def _csv(tabela):
+    return tabela.to_csv(index=False).encode()
+
+def _assert_planilhas_iguais(obtida, esperada):
+    pd.testing.assert_frame_equal(obtida.data, esperada.data)
+    pd.testing.assert_frame_equal(obtida.notas, esperada.notas)
+    assert obtida.esquema == esperada.esquema
+    assert obtida.particoes == esperada.particoes
+    assert obtida.indices == esperada.indices
+    assert (obtida.hashes == esperada.hashes).all()
+
+def _editar(tabela):
+    return _tabela(alterar_notas(_csv(tabela), fracao=0.1))
+
+def _inserir(tabela):
+    novas = tabela.sample(20, random_state=1).assign(**{"MATRÍCULA": [str(9_000_000 + i) for i in range(20)]})
+    return pd.concat([tabela.iloc[:100], novas, tabela.iloc[100:]])
+
+def _remover(tabela):
+    return tabela.drop(tabela.sample(30, random_state=2).index)
+
+def _mover(tabela):
+    return pd.concat([tabela.iloc[1:], tabela.iloc[:1]])
+
+def _embaralhar(tabela):
+    return tabela.sample(frac=1, random_state=3)
+
+def _duplicar(tabela):
+    # Matrículas repetidas (pareadas pela ordem de ocorrência), uma delas com outra nota
+    repetidas = tabela.iloc[:10].copy()
+    repetidas.iloc[0, list(tabela.columns).index("MÉDIA")] = "9.9"
+    return pd.concat([tabela, repetidas])
+
+def _sem_matricula(tabela):
+    tabela = tabela.copy()
+    tabela.iloc[:5, list(tabela.columns).index("MATRÍCULA")] = ""
+    return tabela
+
+ALTERACOES = {
+    "editar": _editar,
+    "inserir": _inserir,
+    "remover": _remover,
+    "mover": _mover,
+    "embaralhar": _embaralhar,
+    "duplicar": _duplicar,
+    "sem_matricula": _sem_matricula,
+}
+
+@pytest.mark.parametrize("layout", ["simples", "consolidada"])
+@pytest.mark.parametrize("alteracao", ALTERACOES)
+def test_atualizacao_incremental_igual_a_reconstrucao(layout, alteracao):
+    """Com a versão anterior, o resultado é o mesmo de processar a planilha do zero."""
+    original = gerar_planilha(LINHAS, layout, turmas=TURMAS)
+    tabela = _tabela(original)
+    nova = _tabela(_csv(ALTERACOES[alteracao](tabela)))
+
+    anterior = processar_planilha(original)
+    incremental = processar_planilha(_csv(nova), anterior=anterior)
+    reconstruida = processar_planilha(_csv(nova))
+
+    _assert_planilhas_iguais(incremental, reconstruida)
+    assert reconstruida.alteracoes is None and incremental.alteracoes is not None
+    inseridas = sum(alteracao.inseridas for alteracao in incremental.alteracoes.values())
+    removidas = sum(alteracao.removidas for alteracao in incremental.alteracoes.values())
+    assert inseridas - removidas == len(nova) - len(tabela)
+    if alteracao in ("mover", "embaralhar"):
+        # Só a ordem mudou: nenhuma linha é dada como alterada
+        assert incremental.alteracoes == {}
+
+def test_atualizacao_sem_mudancas_reaproveita_indices():
+    """A mesma planilha de novo reaproveita os índices da versão anterior, sem alterações."""
+    conteudo = gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)
+    anterior = processar_planilha(conteudo)
+    nova = processar_planilha(conteudo, anterior=anterior)
+    assert nova.indices is anterior.indices and nova.alteracoes == {}
+
+@pytest.mark.parametrize("layout", ["simples", "consolidada"])
+@pytest.mark.parametrize("turmas", [None, ("4P_A", "4P_C")])
+def test_leitura_em_blocos_igual_a_leitura_inteira(monkeypatch, layout, turmas):
+    """Planilhas acima de LIMITE_LEITURA_EM_BLOCOS, lidas em blocos, dão o mesmo resultado."""
+    conteudo = gerar_planilha(LINHAS, layout, turmas=TURMAS)
+    inteira = processar_planilha(conteudo, turmas)
+
+    monkeypatch.setattr(modulo_planilha, "LIMITE_LEITURA_EM_BLOCOS", len(conteudo) // 4)
+    monkeypatch.setattr(modulo_planilha, "LINHAS_POR_BLOCO", 37)
+    em_blocos = processar_planilha(conteudo, turmas)
+
+    _assert_planilhas_iguais(em_blocos, inteira)
+    if turmas and layout == "consolidada":
+        assert set(em_blocos.particoes) == set(turmas)
@@ -0,0 +1,45 @@
+"""Memória dos resultados por aluno (notas.resultados)."""
+from benchmarks.planilhas import TURMAS, alterar_notas, gerar_planilha
+from notas.cache import CacheDePlanilhas
+from notas.resultados import MemoDeResultados
+from tests.conftest import LINHAS
+
+def test_descarta_o_menos_usado_acima_da_capacidade():
+    """Acima da capacidade, sai o resultado usado há mais tempo."""
+    memo = MemoDeResultados(CacheDePlanilhas(), capacidade=3)
+    calculados = []
+
+    def obter(chave):
+        return memo.obter("url", "v1", (chave,), lambda: calculados.append(chave) or chave)
+
+    for chave in "abc":
+        obter(chave)
+    obter("a")  # "a" passa a ser o mais recente; "b" é o próximo a sair
+    obter("d")
+    assert len(memo) == 3
+    for chave in "acd":
+        obter(chave)
+    assert calculados == list("abcd")
+    obter("b")
+    assert calculados == list("abcdb")
+
+def test_nova_versao_descarta_os_resultados_anteriores(servidor):
+    """Uma nova versão da planilha descarta os resultados calculados com a anterior, só dessa planilha."""
+    conteudo = gerar_planilha(LINHAS, "consolidada", turmas=TURMAS)
+    url = servidor.publicar("consolidada.csv", conteudo)
+    cache = CacheDePlanilhas()
+    memo = MemoDeResultados(cache)
+
+    versao = cache.obter_entrada(url).hash_conteudo
+    memo.obter(url, versao, ("4P_A", 1), lambda: "antigo")
+    memo.obter("outra", "v1", ("4P_A", 1), lambda: "outra planilha")
+
+    # Revalidação sem mudança (304) não descarta nada
+    cache.revalidar(url)
+    assert len(memo) == 2
+
+    servidor.publicar("consolidada.csv", alterar_notas(conteudo, fracao=0.1))
+    nova = cache.revalidar(url).hash_conteudo
+    assert len(memo) == 1
+    assert memo.obter(url, nova, ("4P_A", 1), lambda: "novo") == "novo"
+    assert memo.obter("outra", "v1", ("4P_A", 1), lambda: "recalculado") == "outra planilha"